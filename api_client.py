@@ -0,0 +1,43 @@
+"""Client for the HTTP API in server.py, using only the standard library."""
+import json
+import urllib.request
+
+from llm import FALLBACK_RESPONSE
+
+
+def stream_chat(base_url, message, session_id=None, timeout=60):
+    """Yield (event, payload) pairs from the POST /chat event stream"""
+    body = json.dumps({"message": message, "session_id": session_id}).encode("utf-8")
+    request = urllib.request.Request(
+        base_url.rstrip("/") + "/chat", data=body,
+        headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        event = None
+        for raw in response:
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                yield event, json.loads(line[5:])
+
+
+def remote_turn(base_url, session_id, user_input, all_messages, on_delta=None):
+    """process_user_message over HTTP: returns (response, updated_messages) the same way"""
+    text = ""
+    try:
+        for event, payload in stream_chat(base_url, user_input, session_id):
+            if event == "delta":
+                text += payload["text"]
+                if on_delta is not None:
+                    on_delta(text)
+            elif event == "done":
+                if payload["refused"]:
+                    return payload["response"], all_messages
+                return payload["response"], all_messages + [
+                    {'role': 'user', 'content': user_input},
+                    {'role': 'assistant', 'content': payload["response"]}
+                ]
+    except OSError:
+        pass
+    return FALLBACK_RESPONSE, all_messages
@@ -0,0 +1,93 @@
+"""Benchmark: CatalogIndex lookups vs the old per-request substring scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog_index [--sizes 10000 50000 100000]
+"""
+import argparse
+import random
+import time
+
+from catalog import CatalogIndex
+
+BRANDS = ["smartx", "pixelview", "ecophone", "galaxy", "fotosnap", "actioncam",
+          "budgetview", "ultraoled", "gamemaster", "smarthub", "sportfit", "kidsafe",
+          "elitetime", "fitband", "edutab", "budgetpad", "artpad", "bizpad"]
+KINDS = ["phone", "camera", "tv", "watch", "tablet", "band", "drone"]
+TRIMS = ["pro", "lite", "ultra", "mini", "max", "plus", "x", "compact"]
+
+QUERIES = [
+    "What phones do you have?",
+    "Tell me about the iPhone 16.",
+    "Which tablet is best for students?",
+    "I have a problem with my order, can you help?",
+    "need a camera under $500 for vlogging",
+    "compare the galaxy s24 and the pixelview ultra 7",
+    "what is the best tv for gaming in a small room",
+    "do you sell smartwatches with gps and long battery life",
+]
+
+
+def legacy_scan(user_input, products_dict):
+    """The pre-index implementation of find_category_and_product_only"""
+    user_input = user_input.lower()
+    matched_products = []
+    for key, info in products_dict.items():
+        if (key in user_input or
+            any(word in user_input for word in key.split()) or
+            any(word in user_input for word in info["name"].lower().split())):
+            matched_products.append(info)
+    seen = set()
+    unique = []
+    for p in matched_products:
+        if p["name"] not in seen:
+            seen.add(p["name"])
+            unique.append(p)
+    return unique
+
+
+def synthetic_catalog(size, seed=0):
+    rng = random.Random(seed)
+    products = {}
+    for i in range(size):
+        brand, kind, trim = rng.choice(BRANDS), rng.choice(KINDS), rng.choice(TRIMS)
+        key = f"{brand}{i} {kind}"
+        products[key] = {
+            "name": f"{brand.title()}{i} {trim.title()} {kind.title()}",
+            "price": f"${rng.randint(29, 1999)}",
+            "features": [f"{rng.randint(32, 1024)}GB storage", f"{rng.randint(1, 30)}-day battery"],
+            "description": f"Synthetic {kind} #{i}",
+        }
+    return products
+
+
+def per_query_ms(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'skus':>8} {'build ms':>10} {'scan ms/q':>10} {'index ms/q':>11} {'speedup':>8} {'scan hits':>10} {'index hits':>11}")
+    for size in args.sizes:
+        products = synthetic_catalog(size)
+        start = time.perf_counter()
+        index = CatalogIndex(products)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        scan_ms = per_query_ms(lambda q: legacy_scan(q, products), QUERIES, 1)
+        index_ms = per_query_ms(index.match, QUERIES, args.repeat * 100)
+        scan_hits = sum(len(legacy_scan(q, products)) for q in QUERIES)
+        index_hits = sum(len(index.match(q)) for q in QUERIES)
+        print(f"{size:>8} {build_ms:>10.1f} {scan_ms:>10.2f} {index_ms:>11.4f} "
+              f"{scan_ms / index_ms:>7.0f}x {scan_hits:>10} {index_hits:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: per-request catalog cost before and after the shared Catalog.
+
+Before, every turn re-evaluated the ~40-entry dict literal in
+get_products_and_category() and every Streamlit rerun rebuilt the index.
+Now chatbot.py asks get_catalog() for the process-wide instance.
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog_load
+"""
+import time
+import tracemalloc
+
+import catalog
+from catalog import CatalogIndex, builtin_catalog, get_catalog
+
+QUERY = "Tell me about the iPhone 16."
+
+
+def legacy_literal():
+    """Compile the old flat dict literal so it is re-evaluated on each call like before"""
+    flat = {key: info for items in catalog._INVENTORY.values() for key, info in items.items()}
+    flat.update(catalog.category_aliases(catalog.builtin_catalog().products))
+    namespace = {}
+    exec(f"def get_products_and_category():\n    return {flat!r}\n", namespace)
+    return namespace["get_products_and_category"]
+
+
+def measure(fn, repeat=2000):
+    """Mean wall time (us) and bytes allocated per call"""
+    fn()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn() for _ in range(50)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / len(kept)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / repeat, allocated
+
+
+def main():
+    get_products_and_category = legacy_literal()
+    cases = [
+        ("before: dict literal per turn", get_products_and_category),
+        ("before: dict + index per rerun", lambda: CatalogIndex(get_products_and_category())),
+        ("after: shared catalog per turn", get_catalog),
+    ]
+    print(f"{'case':<34} {'us/call':>10} {'bytes/call':>12}")
+    for label, fn in cases:
+        usec, allocated = measure(lambda fn=fn: (fn(), get_catalog().match(QUERY))[0])
+        print(f"{label:<34} {usec:>10.1f} {allocated:>12.0f}")
+
+    tracemalloc.start()
+    builtin_catalog.cache_clear()
+    get_catalog()
+    print(f"\nshared catalog resident size: {tracemalloc.get_traced_memory()[0]} bytes (built once per process)")
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
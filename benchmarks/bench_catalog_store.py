@@ -0,0 +1,93 @@
+"""Benchmark: loading catalog files, and hot-reloading them under reads.
+
+Writes synthetic catalogs as a JSON array, JSON Lines and SQLite, then
+reports load time and peak traced memory, both per 10k products. The reload
+part rewrites the file while a thread keeps calling CatalogStore.get() and
+reports how long the new catalog took to appear and the slowest get() seen
+meanwhile (readers are never blocked by the rebuild).
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog_store [--sizes 10000 100000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.bench_catalog_index import synthetic_catalog
+from catalog import CatalogStore, Product, load_catalog, save_catalog
+
+CATEGORIES = {"phone": "Smartphones", "camera": "Cameras", "tv": "Televisions", "watch": "Watches",
+              "tablet": "Tablets", "band": "Watches", "drone": "Cameras"}
+
+
+def synthetic_products(size, seed=0):
+    return [Product(key, category=CATEGORIES[key.split()[-1]], **info)
+            for key, info in synthetic_catalog(size, seed).items()]
+
+
+def measure_load(path):
+    """(seconds, peak bytes) to load path into a Catalog; timed without tracemalloc, which slows it down"""
+    start = time.perf_counter()
+    load_catalog(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    load_catalog(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def measure_reload(path, size):
+    """(ms until the reloaded catalog is visible, slowest get() in ms meanwhile)"""
+    store = CatalogStore(path, poll_interval=0.0)
+    slowest = [0.0]
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            store.get()
+            slowest[0] = max(slowest[0], time.perf_counter() - start)
+            time.sleep(0.0005)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    old = store.catalog
+    tmp = path + ".tmp" + os.path.splitext(path)[1]
+    save_catalog(tmp, synthetic_products(size, seed=1))
+    start = time.perf_counter()
+    os.replace(tmp, path)
+    while store.catalog is old:
+        time.sleep(0.001)
+    visible = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return visible * 1000, slowest[0] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'skus':>8} {'format':>7} {'file MB':>8} {'load s':>8} {'s/10k':>7} {'peak MB':>8} {'MB/10k':>7} "
+          f"{'reload ms':>10} {'max get ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            products = synthetic_products(size)
+            for ext in (".json", ".jsonl", ".db"):
+                path = os.path.join(tmp, f"catalog{size}{ext}")
+                save_catalog(path, products)
+                elapsed, peak = measure_load(path)
+                reload_ms, max_get_ms = measure_reload(path, size)
+                per = size / 10_000
+                print(f"{size:>8} {ext[1:]:>7} {os.path.getsize(path) / 1e6:>8.1f} {elapsed:>8.2f} "
+                      f"{elapsed / per:>7.3f} {peak / 1e6:>8.1f} {peak / 1e6 / per:>7.1f} "
+                      f"{reload_ms:>10.0f} {max_get_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark: Streamlit script time per rerun vs conversation length.
+
+Runs chatbot.py headless with streamlit's AppTest, resumes a stored session
+of N turns (?session=... on a SQLite session store) and times full reruns,
+once rendering the whole transcript (the old behaviour, via a huge
+CHAT_PAGE_TURNS) and once with the default page of recent turns. No
+request reaches OpenAI: reruns do not send a message.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_render [--turns 10 100 1000] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+from sessions import SessionStore, SQLiteBackend
+
+APP = str(Path(__file__).resolve().parent.parent / "chatbot.py")
+
+
+def history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({'role': 'user', 'content': f"Question {i}: what phones do you have under $800?"})
+        messages.append({'role': 'assistant', 'content': f"Answer {i}: the SmartX ProPhone is $899 and the "
+                                                          "MobiTech PowerCase... " * 3})
+    return messages
+
+
+def stored_session(turns):
+    """Id of a session holding turns in the $SESSION_STORE_PATH store"""
+    store = SessionStore(SQLiteBackend(os.environ["SESSION_STORE_PATH"]))
+    session = store.open(f"bench{turns}")
+    if not session.messages:
+        session.messages = history(turns)
+        store.save(session)
+    return session.id
+
+
+def rerun_ms(turns, page_turns, repeat):
+    """(ms per rerun, elements rendered) with a stored history of turns"""
+    os.environ["CHAT_PAGE_TURNS"] = str(page_turns)
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.query_params["session"] = stored_session(turns)
+    app.run()
+    assert len(app.session_state.messages) == 2 * turns
+    assert not app.exception, app.exception
+    start = time.perf_counter()
+    for _ in range(repeat):
+        app.run()
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+    return elapsed, len(app.markdown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    print(f"{'turns':>6} {'full ms':>9} {'elements':>9} {'paged ms':>9} {'elements':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SESSION_STORE_PATH"] = os.path.join(tmp, "sessions.db")
+        for turns in args.turns:
+            full, full_elements = rerun_ms(turns, 10 ** 9, args.repeat)
+            paged, paged_elements = rerun_ms(turns, 20, args.repeat)
+            print(f"{turns:>6} {full:>9.1f} {full_elements:>9} {paged:>9.1f} {paged_elements:>9}")
+
+
+if __name__ == "__main__":
+    main()
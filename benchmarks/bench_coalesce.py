@@ -0,0 +1,129 @@
+"""Benchmark: N concurrent identical questions through CoalescingClient cost one upstream completion.
+
+Fires --duplicates simultaneous "Tell me about the iPhone 16." turns
+through ChatPipeline (no response cache) over a delayed FakeOpenAI, with
+and without coalescing, blocking and streamed (stream subscribers join at
+staggered times and replay what they missed). Reports upstream completion
+calls, wall time and whether every caller got the same reply. Then checks
+cancellation (all subscribers leave after one chunk: the upstream stream
+is closed early) and timeouts (waiters of a stalled call give up with
+TimeoutError while the first caller keeps waiting).
+
+Run from the repository root:
+    python -m benchmarks.bench_coalesce [--duplicates 50] [--delay 0.3]
+"""
+import argparse
+import random
+import threading
+import time
+
+from coalesce import CoalescingClient
+from fake_openai import FakeOpenAI
+from pipeline import ChatPipeline
+
+QUESTION = "Tell me about the iPhone 16."
+
+
+def burst(pipeline, duplicates, stream, stagger):
+    """(wall seconds, replies) for duplicates concurrent turns, started within stagger seconds"""
+    barrier = threading.Barrier(duplicates)
+    replies = [None] * duplicates
+    rng = random.Random(0)
+    offsets = [rng.uniform(0, stagger) for _ in range(duplicates)]
+
+    def turn(i):
+        barrier.wait()
+        time.sleep(offsets[i])
+        on_delta = (lambda text: None) if stream else None
+        replies[i] = pipeline.process_user_message(QUESTION, [], on_delta=on_delta)[0]
+
+    threads = [threading.Thread(target=turn, args=(i,)) for i in range(duplicates)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, replies
+
+
+def counting_fake(delay):
+    """A delayed FakeOpenAI that also counts streamed chunks produced upstream"""
+    fake = FakeOpenAI(first_token_delay=delay, token_delay=0.005)
+    fake.chunks_sent = 0
+    stream = fake._stream
+
+    def counted(text):
+        for chunk in stream(text):
+            fake.chunks_sent += 1
+            yield chunk
+
+    fake._stream = counted
+    return fake
+
+
+def cancellation(delay, subscribers):
+    """(chunks the upstream produced, chunks in the full reply) when every subscriber stops after one chunk"""
+    fake = counting_fake(delay)
+    client = CoalescingClient(fake)
+    request = {"model": "gpt-3.5-turbo", "messages": [{'role': 'user', 'content': QUESTION}], "stream": True}
+    streams = [client.chat.completions.create(**request) for _ in range(subscribers)]
+    for stream in streams:
+        next(iter(stream))
+        stream.close()
+    time.sleep(0.1)  # let the pump notice
+    full = len(fake._chunks(fake._reply_text(request["messages"]))) + 1
+    return fake.chunks_sent, full, fake.calls["chat"]
+
+
+def timeouts(delay, waiters, timeout):
+    """(waiters that timed out, whether the first caller still got its reply)"""
+    client = CoalescingClient(FakeOpenAI(first_token_delay=delay), timeout=timeout)
+    request = {"model": "gpt-3.5-turbo", "messages": [{'role': 'user', 'content': QUESTION}]}
+    outcomes = []
+    leader = threading.Thread(target=lambda: outcomes.append(("leader", client.chat.completions.create(**request))))
+    leader.start()
+    time.sleep(0.02)
+
+    def wait():
+        try:
+            client.chat.completions.create(**request)
+            outcomes.append(("waiter", "ok"))
+        except TimeoutError:
+            outcomes.append(("waiter", "timeout"))
+
+    threads = [threading.Thread(target=wait) for _ in range(waiters)]
+    for thread in threads:
+        thread.start()
+    for thread in threads + [leader]:
+        thread.join()
+    timed_out = sum(1 for role, outcome in outcomes if role == "waiter" and outcome == "timeout")
+    return timed_out, any(role == "leader" for role, _ in outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.3, help="fake time to first token, seconds")
+    args = parser.parse_args()
+
+    print(f"{args.duplicates} concurrent duplicates, {args.delay * 1000:.0f} ms to first token")
+    print(f"{'mode':>10} {'client':>11} {'upstream':>9} {'wall ms':>8} {'same reply':>11}")
+    for stream in (False, True):
+        for coalesced in (False, True):
+            fake = FakeOpenAI(first_token_delay=args.delay, token_delay=0.005)
+            client = CoalescingClient(fake) if coalesced else fake
+            pipeline = ChatPipeline(client, semantic=False)
+            elapsed, replies = burst(pipeline, args.duplicates, stream, stagger=args.delay / 2 if stream else 0.0)
+            print(f"{'streamed' if stream else 'blocking':>10} {'coalescing' if coalesced else 'plain':>11} "
+                  f"{fake.calls['chat']:>9} {elapsed * 1000:>8.0f} {str(len(set(replies)) == 1):>11}")
+
+    sent, full, calls = cancellation(args.delay, subscribers=10)
+    print(f"\ncancellation: 10 subscribers left after one chunk; upstream calls {calls}, "
+          f"produced {sent} of {full} chunks before being closed")
+    timed_out, leader_ok = timeouts(delay=0.5, waiters=10, timeout=0.1)
+    print(f"timeouts: {timed_out}/10 waiters gave up after 0.1 s on a 0.5 s call; "
+          f"first caller {'still got' if leader_ok else 'lost'} its reply")
+
+
+if __name__ == "__main__":
+    main()
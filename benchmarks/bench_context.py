@@ -0,0 +1,53 @@
+"""Benchmark: tokens sent per turn with the full history vs a ContextWindow.
+
+Replays a synthetic long session and prints the prompt size at a few turn
+counts, plus the time spent building the context.
+
+Run from the repository root:
+    python -m benchmarks.bench_context [--turns 200] [--budget 3000]
+"""
+import argparse
+import random
+import time
+
+from catalog import get_catalog
+from context import ContextWindow, message_tokens
+
+SYSTEM = [{'role': 'system', 'content': "You are Sarah, a sales representative at TechStore. " * 40}]
+
+
+def synthetic_turn(rng, names):
+    name = rng.choice(names)
+    question = f"How does the {name} compare for {rng.choice(['travel', 'gaming', 'work', 'kids'])}?"
+    answer = f"The {name} is a great pick. " + "It has excellent features and battery life. " * rng.randint(3, 12)
+    return {'role': 'user', 'content': question}, {'role': 'assistant', 'content': answer}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=3000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    names = [p.name for p in get_catalog().products]
+
+    window = ContextWindow(max_tokens=args.budget)
+    history, full_sizes, build_us = [], [], []
+    for _ in range(args.turns):
+        user, reply = synthetic_turn(rng, names)
+        full_sizes.append(sum(message_tokens(m) for m in SYSTEM + history + [user]))
+        start = time.perf_counter()
+        window.build(SYSTEM, history, user)
+        build_us.append((time.perf_counter() - start) * 1e6)
+        history = history + [user, reply]
+
+    print(f"{'turn':>6} {'full history':>13} {'budgeted':>9}")
+    for turn in (1, 5, 10, 25, 50, 100, 200, 500, 1000):
+        if turn <= args.turns:
+            print(f"{turn:>6} {full_sizes[turn - 1]:>13} {window.tokens_sent[turn - 1]:>9}")
+    print(f"\ntotal tokens: full {sum(full_sizes)}, budgeted {sum(window.tokens_sent)}; "
+          f"mean build {sum(build_us) / len(build_us):.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark: structured product queries on NumPy columns vs a Python scan.
+
+Builds synthetic catalogs, parses constrained questions and answers them
+with ProductTable.search (vectorized masks + partial sort) and with a plain
+filter-and-sort over the Product objects, checking both agree.
+
+Run from the repository root:
+    python -m benchmarks.bench_filtering [--sizes 10000 100000]
+"""
+import argparse
+import time
+
+from benchmarks.bench_catalog_store import synthetic_products
+from catalog import Catalog
+from filtering import DEFAULT_LIMIT, ProductTable, parse_query
+
+QUESTIONS = [
+    "I need a camera under $500",
+    "cheapest 3 phones with at least 256GB",
+    "tv between $500 and $1,000",
+    "a watch with 7-day battery or more under $300",
+    "most storage phone",
+    "top 10 tablets",
+]
+
+
+def sort_value(query):
+    column = (query.sort or ("price", False))[0]
+    return (lambda p: p.price_value) if column == "price" else (lambda p: p.attributes.get(column))
+
+
+def scan(products, query):
+    """The straightforward implementation"""
+    value = sort_value(query)
+    hits = [p for p in products if query.accepts(p) and value(p) is not None]
+    return sorted(hits, key=value, reverse=bool(query.sort and query.sort[1]))[:query.limit or DEFAULT_LIMIT]
+
+
+def per_query_us(fn, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'skus':>8} {'parse us/q':>11} {'table ms':>9} {'scan us/q':>10} {'table us/q':>11} {'speedup':>8}")
+    for size in args.sizes:
+        catalog = Catalog(synthetic_products(size))
+        start = time.perf_counter()
+        table = ProductTable(catalog.products)
+        build_ms = (time.perf_counter() - start) * 1000
+        parse_us = per_query_us(lambda q: parse_query(q, catalog), QUESTIONS, args.repeat * 20)
+        queries = [parse_query(q, catalog) for q in QUESTIONS]
+        for query in queries:
+            # Ties may be broken differently, but the sorted-on values must agree
+            value = sort_value(query)
+            assert [value(p) for p in scan(catalog.products, query)] == [value(p) for p in table.search(query)], query
+        scan_us = per_query_us(lambda q: scan(catalog.products, q), queries, args.repeat)
+        table_us = per_query_us(table.search, queries, args.repeat)
+        print(f"{size:>8} {parse_us:>11.1f} {build_ms:>9.1f} {scan_us:>10.0f} {table_us:>11.0f} "
+              f"{scan_us / table_us:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark: accuracy and latency of FuzzyIndex vs the whole-token CatalogIndex on misspelled queries.
+
+The built-in products are padded with synthetic filler up to each size.
+Filler products get invented brand names and the generic words ("pro",
+"smart", "watch", "plus", ...), so at 100k SKUs those words name
+thousands of products. Each query has the names it should find; one
+naming only a category should find its summary entry ("Tablet
+Selection"). The benchmark reports, per index, top-1 accuracy, mean
+precision and recall over all queries, and lookup latency (p50 / p99 /
+max microseconds per query, timed one call at a time).
+
+Run from the repository root:
+    python -m benchmarks.bench_fuzzy [--sizes 0 100000] [--repeat 50] [--verbose]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from catalog import Catalog, get_catalog, product_from_record
+from evaluate import percentile, score_products
+from fuzzy import FuzzyIndex
+
+QUERIES = [
+    ("iphon 16", ["iPhone 16"]),
+    ("galxy s24", ["Samsung Galaxy S24"]),
+    ("fotosnapp", ["FotoSnap DSLR Camera", "FotoSnap Compact Camera"]),
+    ("one plus", ["OnePlus 12"]),
+    ("tell me about the pixelvew ultra", ["PixelView Ultra"]),
+    ("samsng qled tv", ["Samsung 65-inch QLED TV"]),
+    ("is the actoncam waterproof?", ["ActionCam Pro"]),
+    ("mirorless camra", ["Mirrorless Pro X"]),
+    ("kidsafe wacth for my son", ["KidSafe Watch"]),
+    ("how much is the foto snap compact", ["FotoSnap Compact Camera"]),
+    ("eco phone lite", ["EcoPhone Lite"]),
+    ("gamemastr tv", ["GameMaster 65-inch"]),
+    ("smart watch", ["Watch Selection"]),
+    ("Do you sell tablets?", ["Tablet Selection"]),
+    ("I need a tv", ["Television Selection"]),
+    ("Which watch should I buy?", ["Watch Selection"]),
+    ("Which tablet is best for students?", ["Tablet Selection"]),
+    ("tell me about the pro", []),
+    ("I have a problem with my order", []),
+]
+
+BRAND_SYLLABLES = ["ka", "zo", "vi", "lu", "mer", "tan", "dex", "ro", "qui", "sen", "bo", "ra", "tor", "nex", "vo"]
+TRIMS = ["Pro", "Lite", "Ultra", "Mini", "Max", "Plus", "X", "Smart"]
+KINDS = {"Phone": "Smartphones", "Smart Watch": "Watches", "Camera": "Cameras", "Smart TV": "Televisions",
+         "Tablet": "Tablets", "Fitness Band": "Watches"}
+
+
+def filler_products(count, seed=0):
+    """count synthetic products named "<Brand> <Model> <Trim> <Kind>" from a few thousand invented brands"""
+    rng = random.Random(seed)
+    brands = sorted({"".join(rng.choice(BRAND_SYLLABLES) for _ in range(rng.randint(2, 3))) for _ in range(4000)})
+    products = []
+    for i in range(count):
+        brand, trim, kind = rng.choice(brands), rng.choice(TRIMS), rng.choice(list(KINDS))
+        model = f"{rng.choice('amsx')}{i}"
+        products.append(product_from_record({
+            "key": f"{brand} {model}", "name": f"{brand.title()} {model.upper()} {trim} {kind}",
+            "price": f"${rng.randint(29, 1999)}", "features": [], "description": f"Synthetic {kind.lower()}",
+            "category": KINDS[kind],
+        }))
+    return products
+
+
+def accuracy(match):
+    """(top-1 accuracy, mean precision, mean recall, per-query names) of match over QUERIES"""
+    top, precisions, recalls, found = 0, [], [], []
+    for query, expected in QUERIES:
+        names = [p.name for p in match(query)]
+        found.append(names)
+        top += (names[0] in expected) if names else not expected
+        precision, recall = score_products(names, expected)
+        precisions.append(precision)
+        recalls.append(recall)
+    return top / len(QUERIES), statistics.mean(precisions), statistics.mean(recalls), found
+
+
+def latencies_us(match, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query, _ in QUERIES:
+            start = time.perf_counter()
+            match(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100_000], help="SKUs (0: built-in only)")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--verbose", action="store_true", help="print what each query matched")
+    args = parser.parse_args()
+
+    builtin = list(get_catalog().products)
+    print(f"{len(QUERIES)} queries")
+    print(f"{'skus':>8} {'index':>8} {'build ms':>9} {'top-1':>6} {'precision':>10} {'recall':>7} "
+          f"{'p50 us':>7} {'p99 us':>7} {'max us':>7}")
+    for size in args.sizes:
+        catalog = Catalog(builtin + filler_products(max(0, size - len(builtin))))
+        start = time.perf_counter()
+        fuzzy = FuzzyIndex(catalog.index, catalog.category_words)
+        build_ms = (time.perf_counter() - start) * 1000
+        for name, index, built in (("exact", catalog.index, None), ("fuzzy", fuzzy, build_ms)):
+            top, precision, recall, found = accuracy(index.match)
+            samples = latencies_us(index.match, args.repeat)
+            print(f"{len(catalog):>8} {name:>8} {'-' if built is None else f'{built:.0f}':>9} {top:>6.0%} "
+                  f"{precision:>10.2f} {recall:>7.2f} {percentile(samples, 50):>7.1f} "
+                  f"{percentile(samples, 99):>7.1f} {max(samples):>7.1f}")
+            if args.verbose:
+                for (query, _), names in zip(QUERIES, found):
+                    shown = ", ".join(names[:4]) + (f" (+{len(names) - 4})" if len(names) > 4 else "")
+                    print(f"{'':>10}{query!r}: {shown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: moderation throughput, one call per message vs micro-batched.
+
+Concurrent callers each moderate a run of user messages through
+llm.moderate against a FakeOpenAI moderation stub with a fixed round-trip
+(--delay) behind ResilientClient's concurrency cap (--upstream-slots), like
+a rate-limited endpoint. Compares plain calls with BatchedModerationClient
+at a few window/batch settings, then repeats with a share of repeated
+messages to show the verdict cache. Reports upstream calls, messages per
+second and per-check latency.
+
+Run from the repository root:
+    python -m benchmarks.bench_moderation [--callers 64] [--messages 20] [--delay 0.05]
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from fake_openai import FakeOpenAI
+from llm import moderate
+from moderation import BatchedModerationClient
+from resilience import ResilientClient
+
+
+def workload(callers, messages, repeat_share, seed=0):
+    """Per caller, the texts it moderates; repeat_share of them are drawn from a small pool of common ones"""
+    rng = random.Random(seed)
+    common = [f"What phones do you have? ({i})" for i in range(20)]
+    return [[rng.choice(common) if rng.random() < repeat_share else f"caller {c} message {m} about a camera"
+             for m in range(messages)] for c in range(callers)]
+
+
+def run(client, texts):
+    """(seconds, per-check latencies)"""
+    latencies = []
+    barrier = threading.Barrier(len(texts))
+
+    def caller(own):
+        barrier.wait()
+        for text in own:
+            start = time.perf_counter()
+            moderate(client, text)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(own,)) for own in texts]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=64)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.05, help="stub round-trip per call, seconds")
+    parser.add_argument("--upstream-slots", type=int, default=8, help="concurrent upstream requests allowed")
+    args = parser.parse_args()
+
+    setups = [("plain", None, None), ("batched", 0.010, 32), ("batched", 0.015, 32), ("batched", 0.020, 64)]
+    print(f"{args.callers} callers x {args.messages} messages, {args.delay * 1000:.0f} ms per call, "
+          f"{args.upstream_slots} upstream slots")
+    print(f"{'repeats':>8} {'client':>8} {'window ms':>10} {'batch':>6} {'calls':>6} {'msgs/s':>8} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'cache hits':>11}")
+    for repeat_share in (0.0, 0.3):
+        texts = workload(args.callers, args.messages, repeat_share)
+        for name, window, batch in setups:
+            fake = FakeOpenAI(moderation_delay=args.delay)
+            client = ResilientClient(fake, max_concurrency=args.upstream_slots)
+            hits = "-"
+            if window is not None:
+                client = BatchedModerationClient(client, window=window, max_batch=batch)
+            elapsed, latencies = run(client, texts)
+            if window is not None:
+                hits = client.batcher.cache.hits
+            total = args.callers * args.messages
+            print(f"{repeat_share:>8.0%} {name:>8} {(window or 0) * 1000:>10.0f} {batch or 1:>6} "
+                  f"{fake.calls['moderation']:>6} {total / elapsed:>8.0f} "
+                  f"{statistics.median(latencies) * 1000:>7.1f} {latencies[int(len(latencies) * 0.99)] * 1000:>7.1f} "
+                  f"{hits:>11}")
+
+
+if __name__ == "__main__":
+    main()
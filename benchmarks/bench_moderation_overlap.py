@@ -0,0 +1,66 @@
+"""Benchmark: serial moderation + completion vs the concurrent pipeline.
+
+FakeOpenAI stands in for the API with configurable delays, so the numbers
+show the latency structure only: serial pays moderation + completion,
+concurrent pays max(moderation, completion).
+
+Run from the repository root:
+    python -m benchmarks.bench_moderation_overlap [--moderation 0.15] [--completion 0.6]
+"""
+import argparse
+import time
+
+from fake_openai import FakeOpenAI
+from llm import REFUSAL_RESPONSE, get_completion, moderate, moderated_completion
+
+MESSAGES = [{'role': 'user', 'content': "What phones do you have?"}]
+
+
+def serial(client, user_input):
+    """The old process_user_message order"""
+    if moderate(client, user_input)[0]:
+        return True, REFUSAL_RESPONSE
+    return False, get_completion(client, MESSAGES)
+
+
+def timed_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--moderation", type=float, default=0.15, help="moderation round-trip seconds")
+    parser.add_argument("--completion", type=float, default=0.6, help="completion time-to-first-token seconds")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    client = FakeOpenAI(moderation_delay=args.moderation, first_token_delay=args.completion,
+                        flagged_words=["forbidden"])
+
+    first_delta = []
+
+    def streamed(text):
+        start = time.perf_counter()
+        seen = []
+        moderated_completion(client, text, MESSAGES,
+                             on_delta=lambda _: seen or seen.append(time.perf_counter() - start))
+        first_delta.append(seen[0])
+
+    cases = [
+        ("serial", lambda: serial(client, "What phones do you have?")),
+        ("concurrent", lambda: moderated_completion(client, "What phones do you have?", MESSAGES)),
+        ("concurrent + output check", lambda: moderated_completion(client, "What phones do you have?", MESSAGES,
+                                                                   moderate_output=True)),
+        ("concurrent, flagged input", lambda: moderated_completion(client, "forbidden words", MESSAGES)),
+        ("concurrent stream", lambda: streamed("What phones do you have?")),
+    ]
+    print(f"{'pipeline':<28} {'ms/turn':>8}")
+    for label, fn in cases:
+        print(f"{label:<28} {timed_ms(fn, args.repeat):>8.0f}")
+    print(f"{'stream first text':<28} {1000 * sum(first_delta) / len(first_delta):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
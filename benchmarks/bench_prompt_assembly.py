@@ -0,0 +1,81 @@
+"""Benchmark: prompt assembly cost and prefix stability.
+
+Compares the old layout (product info interpolated into the middle of the
+system f-string, product blocks re-rendered each call) with the current
+one (constant SYSTEM_MESSAGE + memoized product blocks in a per-turn
+message), and checks that consecutive requests share their prefix.
+
+Run from the repository root:
+    python -m benchmarks.bench_prompt_assembly
+"""
+import time
+
+from catalog import get_catalog
+from prompts import SYSTEM_MESSAGE, SYSTEM_PROMPT, generate_product_information, product_context_message
+
+QUESTIONS = ["What phones do you have?", "Tell me about the iPhone 16.", "Which tablet is best for students?",
+             "Any TVs for gaming?", "Compare the watches please", "I need a camera under $500"]
+
+
+def legacy_messages(user_input, history, matched):
+    product_info = "\n\n".join([
+        f"{p['name']} - {p['price']}\nDescription: {p['description']}\nKey Features: {', '.join(p['features'])}"
+        for p in matched
+    ])
+    system_msg = f"""
+You are Sarah, a knowledgeable sales representative at TechStore Electronics.
+
+SPECIFIC PRODUCTS WE HAVE IN STOCK:
+{product_info}
+{SYSTEM_PROMPT}"""
+    return [{'role': 'system', 'content': system_msg}] + history + [{'role': 'user', 'content': user_input}]
+
+
+def current_messages(user_input, history, matched):
+    # Same layout ContextWindow.build produces while the history fits the budget
+    return [SYSTEM_MESSAGE] + history + [product_context_message(generate_product_information(matched)),
+                                         {'role': 'user', 'content': user_input}]
+
+
+def shared_prefix(a, b):
+    """Characters of a's content that b repeats at the same position, message by message"""
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += len(x['content'])
+    return n
+
+
+def assembly_us(build, matched_by_question, repeat=2000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question, matched in matched_by_question:
+            build(question, [], matched)
+    return (time.perf_counter() - start) * 1e6 / (repeat * len(matched_by_question))
+
+
+def main():
+    catalog = get_catalog()
+    matched_by_question = [(q, catalog.match(q)) for q in QUESTIONS]
+    for label, build in (("legacy", legacy_messages), ("current", current_messages)):
+        history = []
+        previous = None
+        shared = []
+        for turn in range(50):
+            question, matched = matched_by_question[turn % len(QUESTIONS)]
+            messages = build(question, history, matched)
+            if previous is not None:
+                shared.append(shared_prefix(previous, messages) / sum(len(m['content']) for m in previous))
+            previous = messages
+            history = history + [{'role': 'user', 'content': question}, {'role': 'assistant', 'content': "Sure!"}]
+        print(f"{label:<8} assembly {assembly_us(build, matched_by_question):>5.2f}us  "
+              f"prefix reused between turns: {100 * sum(shared) / len(shared):5.1f}%")
+
+    messages = [current_messages(q, [], matched) for q, matched in matched_by_question]
+    assert all(m[0] is SYSTEM_MESSAGE for m in messages), "the system prefix must be identical on every request"
+    print("stable prefix check: ok")
+
+
+if __name__ == "__main__":
+    main()
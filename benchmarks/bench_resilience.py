@@ -0,0 +1,77 @@
+"""Benchmark: bare OpenAI client vs ResilientClient against a flaky local server.
+
+FakeOpenAIServer answers over real HTTP and fails a share of requests with
+429 (with Retry-After), 500 or 503. Phase one sends concurrent turns through
+moderated_completion and reports how many got a real answer and at what
+latency; phase two takes the server down and times how fast calls fail
+once the circuit breaker has opened.
+
+Run from the repository root:
+    python -m benchmarks.bench_resilience [--turns 200] [--error-rate 0.2] [--concurrency 32]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from evaluate import percentile
+from fake_openai import FakeOpenAI, FakeOpenAIServer
+from llm import FALLBACK_RESPONSE, moderated_completion
+from resilience import CircuitBreaker, ResilientClient
+
+MESSAGES = [{'role': 'user', 'content': "What phones do you have?"}]
+
+
+def run_turns(client, turns, concurrency):
+    """(answered fraction, latencies in ms) for turns concurrent moderated completions; a fallback reply is
+    not an answer"""
+    def turn(_):
+        start = time.perf_counter()
+        flagged, text = moderated_completion(client, "What phones do you have?", MESSAGES)
+        return not flagged and text != FALLBACK_RESPONSE, (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(turn, range(turns)))
+    return sum(ok for ok, _ in results) / turns, [ms for _, ms in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--latency", type=float, default=0.05, help="completion time-to-first-token seconds")
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(first_token_delay=args.latency, moderation_delay=args.latency / 4)
+    with FakeOpenAIServer(fake, error_rate=args.error_rate, retry_after=0.05) as server:
+        bare = openai.OpenAI(api_key="test", base_url=server.base_url, max_retries=0, timeout=5)
+        resilient = ResilientClient(bare, timeout=5, max_retries=4, base_delay=0.05, max_delay=2.0,
+                                    breaker=CircuitBreaker(failure_threshold=50, reset_timeout=1.0),
+                                    max_concurrency=args.concurrency)
+
+        print(f"{args.turns} turns, {args.concurrency} concurrent, {args.error_rate:.0%} injected errors")
+        print(f"{'client':<12} {'answered':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'requests':>9}")
+        for label, client in (("bare", bare), ("resilient", resilient)):
+            before = server.requests
+            answered, latencies = run_turns(client, args.turns, args.concurrency)
+            print(f"{label:<12} {answered:>9.1%} {percentile(latencies, 50):>8.0f} {percentile(latencies, 95):>8.0f} "
+                  f"{percentile(latencies, 99):>8.0f} {server.requests - before:>9}")
+
+        # Outage: without a breaker every call pays its full retry budget
+        server.down = True
+        print(f"\noutage, {args.turns} turns")
+        print(f"{'client':<12} {'ms/turn':>8} {'requests':>9}")
+        for label, breaker in (("no breaker", CircuitBreaker(failure_threshold=10 ** 9)),
+                               ("breaker", CircuitBreaker(failure_threshold=5, reset_timeout=30.0))):
+            client = ResilientClient(bare, timeout=5, max_retries=4, base_delay=0.05, max_delay=2.0, breaker=breaker)
+            before = server.requests
+            start = time.perf_counter()
+            run_turns(client, args.turns, args.concurrency)
+            elapsed = (time.perf_counter() - start) * 1000 / args.turns
+            print(f"{label:<12} {elapsed:>8.1f} {server.requests - before:>9}")
+
+
+if __name__ == "__main__":
+    main()
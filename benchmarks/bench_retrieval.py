@@ -0,0 +1,76 @@
+"""Benchmark: VectorIndex build and lookup latency on a synthetic catalog.
+
+By default the embedding width is the one the app ships (retrieval.DEFAULT_DIM);
+pass --dim to compare others.
+
+Run from the repository root:
+    python -m benchmarks.bench_retrieval [--size 100000] [--dim 1024]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from retrieval import DEFAULT_DIM, HashingEmbedder, VectorIndex
+
+WORDS = ("phone camera tv watch tablet drone lens sensor battery display oled amoled zoom "
+         "waterproof rugged compact portable gaming kids student business creative sport fitness "
+         "travel vlog stream audio stylus pencil wireless charging storage fast premium budget "
+         "luxury smart ultra lite pro mini max action aerial cinematic hdr refresh").split()
+
+QUERIES = [
+    "something for my kid's homework",
+    "waterproof camera for surfing",
+    "long battery fitness tracker",
+    "cheap tv for a small bedroom",
+    "tablet with a stylus for drawing",
+    "premium phone with a great zoom camera",
+]
+
+
+def synthetic_texts(size, seed=0):
+    rng = random.Random(seed)
+    return [f"Model{i} " + " ".join(rng.choices(WORDS, k=16)) for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.size)
+    start = time.perf_counter()
+    embedder = HashingEmbedder(dim=args.dim).fit(texts)
+    index = VectorIndex.build(texts, embedder, text=str)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.npy")
+        index.save(path)
+        start = time.perf_counter()
+        mapped = VectorIndex.load(path, texts, embedder)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{args.size} items x {args.dim} dims: build {build_s:.1f}s, "
+              f"matrix {index.matrix.nbytes / 2**20:.0f} MiB, mmap open {load_ms:.1f}ms")
+        for label, idx in (("in-memory", index), ("memory-mapped", mapped)):
+            idx.search(QUERIES[0], k=args.k)
+            timings = []
+            for _ in range(args.repeat):
+                for query in QUERIES:
+                    start = time.perf_counter()
+                    idx.search(query, k=args.k)
+                    timings.append((time.perf_counter() - start) * 1000)
+            p50, p99 = np.percentile(timings, [50, 99])
+            print(f"{label:<14} lookup p50 {p50:.2f}ms  p99 {p99:.2f}ms")
+        del mapped
+
+
+if __name__ == "__main__":
+    main()
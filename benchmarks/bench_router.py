@@ -0,0 +1,98 @@
+"""Benchmark: share of production-like traffic the local intent router answers, and the latency saved.
+
+Generates synthetic conversations shaped like the store's traffic (often a
+greeting, a few product questions drawn from the eval set and the sidebar
+suggestions, then thanks and/or goodbye) and plays them through
+ChatPipeline over FakeOpenAI with model-like latency, once with the
+router and once without. Reports the fraction of turns served locally per
+intent, mean turn latency both ways and the time saved per routed turn.
+
+Run from the repository root:
+    python -m benchmarks.bench_router [--conversations 100] [--latency 0.4] [--threshold 0.8]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from catalog import get_catalog
+from context import ContextWindow
+from fake_openai import FakeOpenAI
+from pipeline import ChatPipeline
+from router import IntentRouter
+
+EVAL = Path(__file__).resolve().parent.parent / "eval_conversations.jsonl"
+
+OPENINGS = ["Hi!", "Hello", "hey there", "Good morning", "Hi Sarah"]
+CLOSINGS = ["Thanks!", "Great, thanks!", "thank you so much", "ok bye", "Thanks, bye!", "Goodbye",
+            "that's all, have a nice day"]
+SIMPLE = ["What phones do you have?", "What cameras do you have?", "list all tablets", "Show me all your TVs",
+          "How much is the iPhone 16?", "how much does the galaxy s24 cost?", "price of the OnePlus 12",
+          "Tell me about the iPhone 16."]
+
+
+def questions():
+    turns = [turn["user"] for line in EVAL.open() for turn in json.loads(line)["turns"]]
+    return [t for t in turns if t not in CLOSINGS]
+
+
+def conversations(count, seed=0):
+    rng = random.Random(seed)
+    pool = questions()
+    for _ in range(count):
+        turns = [rng.choice(OPENINGS)] if rng.random() < 0.4 else []
+        for _ in range(rng.randint(1, 3)):
+            turns.append(rng.choice(SIMPLE) if rng.random() < 0.3 else rng.choice(pool))
+        if rng.random() < 0.6:
+            turns.append(rng.choice(CLOSINGS))
+        if rng.random() < 0.3:
+            turns.append("bye")
+        yield turns
+
+
+def play(pipeline, convos):
+    """Seconds per turn, in order"""
+    latencies = []
+    for turns in convos:
+        messages, context = [], ContextWindow()
+        for text in turns:
+            start = time.perf_counter()
+            _, messages = pipeline.process_user_message(text, messages, context=context)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.4, help="fake time to first token, seconds")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(first_token_delay=args.latency, token_delay=0.0, moderation_delay=args.latency / 4)
+    convos = list(conversations(args.conversations))
+    router = IntentRouter(args.threshold)
+    routed = play(ChatPipeline(fake, semantic=False, router=router), convos)
+    baseline = play(ChatPipeline(fake, semantic=False), convos)
+
+    stats = router.stats()
+    catalog = get_catalog()
+    local = [(r := router.classify(text, catalog)) is not None and r.confidence >= args.threshold
+             for turns in convos for text in turns]
+    local_turns = [(r, b) for r, b, is_local in zip(routed, baseline, local) if is_local]
+    print(f"{stats['turns']} turns in {len(convos)} conversations, threshold {args.threshold}")
+    print(f"served locally: {stats['local']} ({stats['local_rate']:.1%})  "
+          + "  ".join(f"{k}={v}" for k, v in sorted(stats["intents"].items())))
+    print(f"mean turn latency: {statistics.mean(baseline) * 1000:.1f} ms without router, "
+          f"{statistics.mean(routed) * 1000:.1f} ms with")
+    if local_turns:
+        local_ms = statistics.mean(r for r, _ in local_turns) * 1000
+        model_ms = statistics.mean(b for _, b in local_turns) * 1000
+        print(f"routed turns: {local_ms:.3f} ms locally vs {model_ms:.1f} ms through the model "
+              f"({model_ms - local_ms:.1f} ms saved each, {sum(b - r for r, b in local_turns):.1f} s in total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark: many sessions appending turns at once to each SessionStore backend.
+
+Threads play concurrent conversations: each opens its session, appends a
+turn (user + assistant message) and saves, like server.run_turn. Reports
+saves per second and open/save latency, then checks every session reads
+back exactly its turns in order. Worker processes then write to the same
+SQLite file / directory at once, and the parent resumes their sessions by
+id. Finally a long session is reopened to show only the recent tail loads.
+
+Run from the repository root:
+    python -m benchmarks.bench_sessions [--sessions 200 --turns 20 --threads 32 --processes 4]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sessions import FileBackend, MemoryBackend, SessionStore, SQLiteBackend
+
+
+def backend_for(kind, path):
+    if kind == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(path + ".db") if kind == "sqlite" else FileBackend(path)
+
+
+def turn(session_id, n):
+    return [{'role': 'user', 'content': f"{session_id} question {n}"},
+            {'role': 'assistant', 'content': f"{session_id} answer {n} " + "lorem ipsum " * 20}]
+
+
+def converse(store, session_id, turns, timings):
+    for n in range(turns):
+        start = time.perf_counter()
+        session = store.open(session_id)
+        opened = time.perf_counter()
+        session.messages = session.messages + turn(session_id, n)
+        session.context.folded = max(0, len(session.messages) - 8)
+        store.save(session)
+        timings.append((opened - start, time.perf_counter() - opened))
+
+
+def verify(store, session_ids, turns):
+    for session_id in session_ids:
+        expected = [m for n in range(turns) for m in turn(session_id, n)]
+        assert list(store.open(session_id).messages) == expected, session_id
+
+
+def run_threads(kind, path, sessions, turns, threads):
+    store = SessionStore(backend_for(kind, path))
+    ids = [f"t{i}" for i in range(sessions)]
+    timings = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for future in [pool.submit(converse, store, session_id, turns, timings) for session_id in ids]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    verify(store, ids, turns)
+    opens = sorted(t[0] for t in timings)
+    saves = sorted(t[1] for t in timings)
+    return {"saves/s": len(timings) / elapsed, "open p50": statistics.median(opens) * 1000,
+            "save p50": statistics.median(saves) * 1000, "save p99": saves[int(len(saves) * 0.99)] * 1000}
+
+
+def process_worker(kind, path, worker, sessions, turns):
+    store = SessionStore(backend_for(kind, path))
+    converse_all = [f"p{worker}-{i}" for i in range(sessions)]
+    timings = []
+    for session_id in converse_all:
+        converse(store, session_id, turns, timings)
+    return len(timings)
+
+
+def run_processes(kind, path, processes, sessions, turns):
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        saves = sum(pool.starmap(process_worker, [(kind, path, w, sessions, turns) for w in range(processes)]))
+    elapsed = time.perf_counter() - start
+    # Resume every session by id in this (different) process
+    verify(SessionStore(backend_for(kind, path)), [f"p{w}-{i}" for w in range(processes) for i in range(sessions)],
+           turns)
+    return saves / elapsed
+
+
+def lazy_resume(kind, path, turns):
+    """(messages stored, messages loaded by open(), ms to open) for one long session"""
+    store = SessionStore(backend_for(kind, path))
+    converse(store, "long", turns, [])
+    start = time.perf_counter()
+    session = store.open("long")
+    elapsed = (time.perf_counter() - start) * 1000
+    loaded = session.messages.loaded
+    assert session.messages[0] == turn("long", 0)[0]  # older turns still there, loaded on demand
+    return len(session.messages), loaded, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--long-turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.turns} turns on {args.threads} threads; "
+          f"{args.processes} processes x {args.sessions // args.processes} sessions")
+    print(f"{'backend':>8} {'saves/s':>9} {'open p50 ms':>12} {'save p50 ms':>12} {'save p99 ms':>12} "
+          f"{'multi-proc saves/s':>19} {'long: stored/loaded':>20} {'open ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("memory", "sqlite", "file"):
+            path = os.path.join(tmp, kind)
+            threads = run_threads(kind, path, args.sessions, args.turns, args.threads)
+            multi = "-" if kind == "memory" else (
+                f"{run_processes(kind, path, args.processes, args.sessions // args.processes, args.turns):.0f}")
+            stored, loaded, open_ms = lazy_resume(kind, path, args.long_turns)
+            print(f"{kind:>8} {threads['saves/s']:>9.0f} {threads['open p50']:>12.3f} "
+                  f"{threads['save p50']:>12.3f} {threads['save p99']:>12.3f} {multi:>19} "
+                  f"{f'{stored}/{loaded}':>20} {open_ms:>8.2f}")
+    print("all sessions read back intact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: cold start, i.e. import time of the core modules and latency of the first responses.
+
+Each measurement runs in a fresh interpreter. Import times are the
+cumulative microseconds ``python -X importtime`` reports for the module
+(median of --repeat runs), alongside which heavy packages (numpy, openai,
+dotenv, streamlit) the import dragged in; core modules should pull none.
+The cold turn part imports the pipeline, answers a first and a second
+question against FakeOpenAI and reports each step, so lazily loaded work
+(NumPy, the vector index) shows up in the first response.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--repeat 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CORE = ["tracing", "catalog", "prompts", "llm", "context", "router", "filtering", "retrieval", "response_cache",
+        "sessions", "pipeline", "server"]
+HEAVY = ["numpy", "openai", "dotenv", "streamlit", "httpx"]
+
+COLD_TURN = """
+import json, sys, time
+start = time.perf_counter()
+from fake_openai import FakeOpenAI
+from pipeline import ChatPipeline
+from router import IntentRouter
+imported = time.perf_counter()
+pipeline = ChatPipeline(FakeOpenAI(), router=IntentRouter() if sys.argv[1] == "router" else None)
+timings = {"import": imported - start}
+for label, text in (("first", sys.argv[2]), ("second", "Which tablet is best for students?")):
+    t = time.perf_counter()
+    pipeline.process_user_message(text, [])
+    timings[label] = time.perf_counter() - t
+timings["total"] = time.perf_counter() - start
+print(json.dumps({k: v * 1000 for k, v in timings.items()}))
+"""
+
+
+def import_us(module):
+    """(cumulative import microseconds, heavy packages loaded) for module in a fresh interpreter"""
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                            check=True)
+    for line in result.stderr.splitlines():
+        fields = [f.strip() for f in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]), result.stdout.split()
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def cold_turn(router, first):
+    result = subprocess.run([sys.executable, "-c", COLD_TURN, router, first], capture_output=True, text=True,
+                            check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':>15} {'import ms':>10}  heavy packages loaded")
+    for module in CORE:
+        runs = [import_us(module) for _ in range(args.repeat)]
+        heavy = runs[0][1]
+        print(f"{module:>15} {statistics.median(us for us, _ in runs) / 1000:>10.1f}  {', '.join(heavy) or '-'}")
+
+    print(f"\n{'cold turn':>28} {'import ms':>10} {'1st turn ms':>12} {'2nd turn ms':>12} {'total ms':>9}")
+    for label, router, first in (("model, 'What phones...?'", "none", "What phones do you have?"),
+                                 ("router, 'Hi!'", "router", "Hi!"),
+                                 ("router, 'What phones...?'", "router", "What phones do you have?")):
+        runs = [cold_turn(router, first) for _ in range(args.repeat)]
+        m = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{label:>28} {m['import']:>10.1f} {m['first']:>12.1f} {m['second']:>12.1f} {m['total']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark: time-to-first-token of streaming vs blocking completions.
+
+Uses FakeOpenAI, so it runs offline. The reply is long enough to mimic a
+~500-token answer; delays are per 4-character delta.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming [--first-token 0.3] [--token 0.005]
+"""
+import argparse
+import time
+
+from fake_openai import FakeOpenAI
+from llm import clean_response, get_completion, stream_completion
+
+REPLY = ("The **iPhone 16** is $999 and comes with a *6.3-inch Super Retina XDR* display, "
+         "256GB storage and the A18 chip.\n") * 12
+MESSAGES = [{'role': 'user', 'content': "Tell me about the iPhone 16."}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--first-token", type=float, default=0.3, help="seconds before the first delta")
+    parser.add_argument("--token", type=float, default=0.005, help="seconds between deltas")
+    args = parser.parse_args()
+    client = FakeOpenAI(reply=REPLY, first_token_delay=args.first_token, token_delay=args.token)
+
+    start = time.perf_counter()
+    blocking = get_completion(client, MESSAGES)
+    blocking_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = None
+    streamed = ""
+    for delta in stream_completion(client, MESSAGES):
+        if first is None:
+            first = time.perf_counter() - start
+        streamed += delta
+    stream_s = time.perf_counter() - start
+
+    assert streamed == clean_response(blocking), "streamed text must match the cleaned blocking reply"
+    print(f"{'mode':<10} {'first text ms':>14} {'total ms':>10}")
+    print(f"{'blocking':<10} {blocking_s * 1000:>14.0f} {blocking_s * 1000:>10.0f}")
+    print(f"{'stream':<10} {first * 1000:>14.0f} {stream_s * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark: cost of the tracing instrumentation.
+
+Times process_user_message against a zero-latency FakeOpenAI with tracing
+off (no sinks: span() returns a shared no-op) and with each sink, plus the
+raw cost of one span() in each mode.
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing [--turns 2000]
+"""
+import argparse
+import logging
+import time
+
+from fake_openai import FakeOpenAI
+from pipeline import ChatPipeline
+from tracing import LogSink, MemorySink, PrometheusSink, configure, span
+
+QUESTIONS = ["Tell me about the iPhone 16.", "Which cameras do you have?", "Compare the TCL and Samsung TVs."]
+
+
+def per_turn_us(pipeline, turns):
+    start = time.perf_counter()
+    for i in range(turns):
+        pipeline.process_user_message(QUESTIONS[i % len(QUESTIONS)], [])
+    return (time.perf_counter() - start) * 1e6 / turns
+
+
+def per_span_ns(n=200000):
+    start = time.perf_counter()
+    for _ in range(n):
+        with span("bench", value=1) as s:
+            s.set(other=2)
+    return (time.perf_counter() - start) * 1e9 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+    # LogSink formats only when its logger is enabled; keep it on but write nowhere
+    logging.getLogger("chat.trace").addHandler(logging.NullHandler())
+    logging.getLogger("chat.trace").setLevel(logging.INFO)
+    logging.getLogger("chat.trace").propagate = False
+
+    pipeline = ChatPipeline(FakeOpenAI(), semantic=False)
+    per_turn_us(pipeline, 100)  # warm caches
+    print(f"{'sinks':<22} {'us/turn':>9} {'ns/span':>9}")
+    for label, sinks in (("off", ()), ("memory", (MemorySink(),)), ("prometheus", (PrometheusSink(),)),
+                         ("log", (LogSink(),)), ("log+prometheus+memory", (LogSink(), PrometheusSink(), MemorySink()))):
+        configure(*sinks)
+        print(f"{label:<22} {per_turn_us(pipeline, args.turns):>9.1f} {per_span_ns():>9.0f}")
+    configure()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Load test for the HTTP API (server.py).
+
+Starts the server in-process against FakeOpenAI (or targets --url), then
+runs --users concurrent sessions that each send --turns chat requests over
+streaming /chat, and reports requests/sec plus time-to-first-delta and
+full-response latency percentiles.
+
+Run from the repository root:
+    python -m benchmarks.load_test [--users 100] [--turns 5] [--fake-latency 0.2]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from evaluate import percentile
+
+QUESTIONS = ["What phones do you have?", "Which tablet is best for students?", "Any TVs for gaming?",
+             "Tell me about the iPhone 16.", "I need a camera under $500", "Thanks, bye!"]
+
+
+async def chat_request(host, port, session_id, message):
+    """(seconds to first delta, seconds to end of response) for one streaming /chat call"""
+    body = json.dumps({"message": message, "session_id": session_id}).encode()
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"POST /chat HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                 b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (host.encode(), len(body), body))
+    await writer.drain()
+    first = None
+    response = b""
+    while chunk := await reader.read(65536):
+        response += chunk
+        if first is None and b"event: " in response:
+            first = time.perf_counter() - start
+    writer.close()
+    if not response.startswith(b"HTTP/1.1 200") or b"event: done" not in response:
+        raise RuntimeError(f"bad response: {response[:200]!r}")
+    return first, time.perf_counter() - start
+
+
+async def user(host, port, turns, results, offset):
+    session_id = uuid.uuid4().hex
+    for turn in range(turns):
+        results.append(await chat_request(host, port, session_id, QUESTIONS[(offset + turn) % len(QUESTIONS)]))
+
+
+async def run(host, port, users, turns):
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(user(host, port, turns, results, i) for i in range(users)))
+    return results, time.perf_counter() - start
+
+
+def start_local_server(port, fake_latency):
+    import uvicorn
+    from server import create_app
+    config = uvicorn.Config(create_app(fake=True, fake_latency=fake_latency), host="127.0.0.1", port=port,
+                            log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        server = start_local_server(args.port, args.fake_latency)
+        host, port = "127.0.0.1", args.port
+
+    results, elapsed = asyncio.run(run(host, port, args.users, args.turns))
+    first = [r[0] * 1000 for r in results]
+    total = [r[1] * 1000 for r in results]
+    print(f"{len(results)} requests from {args.users} sessions in {elapsed:.2f}s: {len(results) / elapsed:.1f} req/s")
+    print(f"first delta ms  p50 {percentile(first, 50):7.1f}  p99 {percentile(first, 99):7.1f}")
+    print(f"full reply ms   p50 {percentile(total, 50):7.1f}  p99 {percentile(total, 99):7.1f}")
+    if server is not None:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
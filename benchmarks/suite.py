@@ -0,0 +1,247 @@
+"""Offline performance suite for the chat pipeline, with JSON output for comparing commits.
+
+Three parts, all against FakeOpenAI (no network, deterministic seeds):
+
+- micro: per-operation cost of catalog matching, the local router, prompt
+  assembly (ContextWindow + product context) and response cleaning
+  (clean_response and StreamCleaner).
+- load: synthetic multi-turn conversations (see bench_router) replayed
+  through process_user_message at --concurrency, with the production
+  client stack (ResilientClient, CoalescingClient, BatchedModerationClient)
+  around a fake whose latencies follow the given distributions
+  ("fixed:S", "uniform:A,B", "normal:M,SD", "lognormal:MEDIAN,SIGMA",
+  "exp:MEAN"). Reports throughput and p50/p95/p99 turn latency (and time to
+  first delta with --stream); --no-router / --no-cache send more turns
+  upstream.
+- memory: peak and retained traced memory per request, from a sequential
+  replay under tracemalloc.
+
+Run from the repository root:
+    python -m benchmarks.suite [--concurrency 32] [--conversations 200] [--json results.json]
+    python -m benchmarks.suite --json new.json --compare old.json [--fail-over 10]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_router import conversations
+from catalog import get_catalog
+from coalesce import CoalescingClient
+from context import ContextWindow
+from evaluate import percentile
+from fake_openai import FakeOpenAI, Latency
+from llm import StreamCleaner, clean_response
+from moderation import BatchedModerationClient
+from pipeline import ChatPipeline
+from prompts import SYSTEM_MESSAGE, generate_product_information, product_context_message
+from resilience import ResilientClient
+from response_cache import ResponseCache
+from router import IntentRouter
+
+QUESTIONS = ["What phones do you have?", "Tell me about the iPhone 16.", "Which tablet is best for students?",
+             "I need a camera under $500", "Compare the Galaxy S24 and the OnePlus 12",
+             "something for my kid's homework", "cheapest 3 tvs with at least 55 inch", "Great, thanks!"]
+REPLY = ("The **iPhone 16** is $999 and comes with a *6.3-inch Super Retina XDR* display, "
+         "256GB storage and the A18 chip.\n") * 8
+
+
+def per_op_us(fn, items, repeat=5, min_ops=200):
+    """Median over repeat rounds of the microseconds per fn(item)"""
+    rounds = max(1, min_ops // len(items))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for item in items:
+                fn(item)
+        samples.append((time.perf_counter() - start) * 1e6 / (rounds * len(items)))
+    return round(statistics.median(samples), 3)
+
+
+def micro(repeat):
+    catalog = get_catalog()
+    pipeline = ChatPipeline(FakeOpenAI())
+    pipeline.warm_up()
+    router = IntentRouter()
+    history = []
+    for i in range(10):
+        history += [{'role': 'user', 'content': QUESTIONS[i % len(QUESTIONS)]}, {'role': 'assistant', 'content': REPLY}]
+    matched = {q: pipeline.match_products(q) for q in QUESTIONS}
+
+    def assemble(question):
+        info = generate_product_information(matched[question])
+        ContextWindow().build([SYSTEM_MESSAGE], history, {'role': 'user', 'content': question},
+                              turn_messages=[product_context_message(info)])
+
+    def stream_clean(text):
+        cleaner = StreamCleaner()
+        for i in range(0, len(text), 4):
+            cleaner.feed(text[i:i + 4])
+        cleaner.finish()
+
+    return {
+        "catalog_index_us": per_op_us(catalog.match, QUESTIONS, repeat),
+        "match_products_us": per_op_us(pipeline.match_products, QUESTIONS, repeat),
+        "router_us": per_op_us(lambda q: router.classify(q, catalog), QUESTIONS, repeat),
+        "prompt_assembly_us": per_op_us(assemble, QUESTIONS, repeat),
+        "clean_response_us": per_op_us(clean_response, [REPLY], repeat),
+        "stream_clean_us": per_op_us(stream_clean, [REPLY], repeat, min_ops=50),
+    }
+
+
+def production_client(fake):
+    """The wrappers create_client() puts around the real client, around fake"""
+    return BatchedModerationClient(CoalescingClient(ResilientClient(fake, max_concurrency=64)))
+
+
+def load(args):
+    fake = FakeOpenAI(first_token_delay=Latency(args.latency, seed=1), token_delay=Latency(args.token_latency, 2),
+                      moderation_delay=Latency(args.moderation_latency, seed=3))
+    pipeline = ChatPipeline(production_client(fake), cache=None if args.no_cache else ResponseCache(),
+                            router=None if args.no_router else IntentRouter())
+    pipeline.warm_up()
+    traces = list(conversations(args.conversations, seed=args.seed))
+    latencies, first_deltas = [], []
+
+    def replay(turns):
+        messages, context = [], ContextWindow()
+        for text in turns:
+            start = time.perf_counter()
+            first = []
+            on_delta = (lambda _: first or first.append(time.perf_counter() - start)) if args.stream else None
+            _, messages = pipeline.process_user_message(text, messages, on_delta=on_delta, context=context)
+            latencies.append(time.perf_counter() - start)
+            first_deltas.extend(first)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(replay, traces))
+    elapsed = time.perf_counter() - start
+    ms = [s * 1000 for s in latencies]
+    result = {
+        "turns": len(latencies), "conversations": len(traces), "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3), "turns_per_s": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(ms, 50), 2), "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2), "mean_ms": round(statistics.mean(ms), 2),
+        "upstream_completions": fake.calls["chat"], "upstream_moderations": fake.calls["moderation"],
+    }
+    if first_deltas:
+        first_ms = [s * 1000 for s in first_deltas]
+        result.update(first_delta_p50_ms=round(percentile(first_ms, 50), 2),
+                      first_delta_p99_ms=round(percentile(first_ms, 99), 2))
+    return result
+
+
+def memory(turns, seed):
+    """Traced KB per request on the full model path (no cache or router): peak while answering it, and what
+    stays allocated afterwards"""
+    pipeline = ChatPipeline(FakeOpenAI())
+    pipeline.warm_up()
+    texts = [t for c in conversations(turns, seed=seed) for t in c][:turns]
+    pipeline.process_user_message(texts[0], [])  # first-call setup is not per request
+    peaks = []
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    messages, context = [], ContextWindow()
+    for i, text in enumerate(texts):
+        if i % 4 == 0:
+            messages, context = [], ContextWindow()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        _, messages = pipeline.process_user_message(text, messages, context=context)
+        peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    retained = (tracemalloc.get_traced_memory()[0] - baseline) / 1024 / len(texts)
+    tracemalloc.stop()
+    return {"requests": len(texts), "peak_kb_mean": round(statistics.mean(peaks), 1),
+            "peak_kb_p95": round(percentile(peaks, 95), 1), "retained_kb_per_request": round(retained, 2)}
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(old, new, fail_over):
+    """Print metric changes; True if none got worse by more than fail_over percent"""
+    old_flat, new_flat = flatten(old["results"]), flatten(new["results"])
+    print(f"\n{'metric':>36} {'before':>10} {'after':>10} {'change':>8}")
+    ok = True
+    for key, value in new_flat.items():
+        if key not in old_flat or not key.endswith(("_us", "_ms", "_kb_mean", "_kb_p95", "_per_request", "_per_s")):
+            continue
+        before = old_flat[key]
+        change = (value - before) / before * 100 if before else 0.0
+        worse = -change if key.endswith("_per_s") else change
+        flag = ""
+        if fail_over is not None and worse > fail_over:
+            ok, flag = False, "  REGRESSION"
+        print(f"{key:>36} {before:>10g} {value:>10g} {change:>+7.1f}%{flag}")
+    return ok
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--latency", default="lognormal:0.3,0.5", help="time to first token distribution")
+    parser.add_argument("--token-latency", default="fixed:0.002", help="per streamed delta")
+    parser.add_argument("--moderation-latency", default="lognormal:0.08,0.4")
+    parser.add_argument("--stream", action="store_true", help="stream replies (reports time to first delta)")
+    parser.add_argument("--no-router", action="store_true", help="send every turn to the model")
+    parser.add_argument("--no-cache", action="store_true", help="no response cache for first turns")
+    parser.add_argument("--memory-turns", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", nargs="*", default=[], choices=["micro", "load", "memory"])
+    parser.add_argument("--json", help="write the results here ('-' for stdout)")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    parser.add_argument("--fail-over", type=float, help="exit 1 if a metric got worse by more than this percent")
+    args = parser.parse_args()
+
+    results = {}
+    if "micro" not in args.skip:
+        results["micro"] = micro(args.repeat)
+    if "load" not in args.skip:
+        results["load"] = load(args)
+    if "memory" not in args.skip:
+        results["memory"] = memory(args.memory_turns, args.seed)
+    report = {
+        "meta": {"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "args": vars(args)},
+        "results": results,
+    }
+    for section, values in results.items():
+        print(f"[{section}] " + "  ".join(f"{k}={v}" for k, v in values.items()))
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(json.load(f), report, args.fail_over):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,635 @@
+"""Product catalog and lookup for the TechStore chatbot.
+
+The catalog comes from the file at $CATALOG_PATH (a JSON array, JSON Lines
+or SQLite, read incrementally) or, without one, from the built-in
+inventory below. Category summary entries ("phone", "tvs", ...) are derived
+from the products, so they always list what is actually in stock. A file
+catalog is watched and reloaded when it changes (see CatalogStore).
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+def tokenize(text):
+    """Split text into lowercase whole-word tokens ("12.9" stays one token)"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=1 << 16)
+def singular(token):
+    """Fold simple English plurals so "phones" and "watches" hit "phone" and "watch"."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ches", "shes", "xes", "sses")):
+        return token[:-2]
+    if len(token) > 2 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+class CatalogIndex:
+    """Inverted token -> product index, built once over a catalog dict.
+
+    Every word of a catalog key (the alias, e.g. "galaxy s24") and of the
+    product name is indexed after plural folding. Entries sharing a name
+    (e.g. the "phone"/"phones" aliases) collapse onto the first one, so
+    lookups return the same de-duplicated list the old scan did.
+    """
+
+    def __init__(self, products_dict):
+        self.products = []
+        postings = {}
+        positions = {}
+        for key, info in products_dict.items():
+            pos = positions.get(info["name"])
+            if pos is None:
+                pos = positions[info["name"]] = len(self.products)
+                self.products.append(info)
+            for token in tokenize(key) + tokenize(info["name"]):
+                postings.setdefault(singular(token), set()).add(pos)
+        self.postings = {token: tuple(sorted(hits)) for token, hits in postings.items()}
+
+    def __len__(self):
+        return len(self.products)
+
+    def match(self, user_input):
+        """Products whose alias or name shares a whole token with user_input, in catalog order"""
+        hits = set()
+        for token in tokenize(user_input):
+            found = self.postings.get(singular(token))
+            if found:
+                hits.update(found)
+        return [self.products[pos] for pos in sorted(hits)]
+
+
+def parse_price(price):
+    """Dollar amount of a price string like "$1,299" (None if it has no number)"""
+    digits = re.sub(r"[^0-9.]", "", price)
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+
+def format_price(amount):
+    return f"${amount:,.0f}" if amount == int(amount) else f"${amount:,.2f}"
+
+
+# Structured attributes read from the feature list (and name): attribute -> (pattern, scale)
+ATTRIBUTE_PATTERNS = {
+    "storage_gb": (re.compile(r"(\d+(?:\.\d+)?)\s*(gb|tb)\b", re.I), {"gb": 1, "tb": 1024}),
+    "screen_inches": (re.compile(r"(\d+(?:\.\d+)?)\s*(?:-\s*)?(inch|in\b|\")", re.I), None),
+    "battery_days": (re.compile(r"(\d+(?:\.\d+)?)\s*-?\s*(day)s?\s+battery", re.I), None),
+    "battery_hours": (re.compile(r"(\d+(?:\.\d+)?)\s*-?\s*(hour)s?\s+battery", re.I), None),
+    "megapixels": (re.compile(r"(\d+(?:\.\d+)?)\s*(mp)\b", re.I), None),
+}
+
+
+def parse_attributes(texts):
+    """{attribute: number} for the ATTRIBUTE_PATTERNS found in texts (first mention wins)"""
+    attributes = {}
+    for text in texts:
+        for attribute, (pattern, scale) in ATTRIBUTE_PATTERNS.items():
+            if attribute in attributes:
+                continue
+            found = pattern.search(text)
+            if found:
+                value = float(found.group(1))
+                attributes[attribute] = value * scale[found.group(2).lower()] if scale else value
+    return attributes
+
+
+class Product:
+    """Immutable, slot-based catalog record; p["name"] still works like the old dicts.
+
+    price stays the display string; price_value and attributes (storage_gb,
+    screen_inches, battery_days, ...) are parsed from it and the features
+    unless given explicitly.
+    """
+    __slots__ = ("key", "name", "price", "features", "description", "category", "price_value", "attributes")
+
+    def __init__(self, key, name, price, features, description, category=None, attributes=None):
+        init = object.__setattr__
+        if isinstance(price, (int, float)):
+            price = format_price(price)
+        features = tuple(sys.intern(f) for f in features)
+        init(self, "key", sys.intern(key))
+        init(self, "name", sys.intern(name))
+        init(self, "price", sys.intern(price))
+        init(self, "features", features)
+        init(self, "description", description)
+        init(self, "category", category)
+        init(self, "price_value", parse_price(price))
+        init(self, "attributes", attributes if attributes is not None else parse_attributes(features + (name,)))
+
+    def __setattr__(self, field, value):
+        raise AttributeError(f"Product is read-only (tried to set {field!r})")
+
+    def __getitem__(self, field):
+        return getattr(self, field)
+
+    def __repr__(self):
+        return f"Product({self.name!r}, {self.price!r})"
+
+
+# Extra words customers use for a category, besides its own name
+CATEGORY_SYNONYMS = {"Smartphones": ("phone",), "Televisions": ("tv",), "Watches": ("smartwatch",)}
+
+
+def category_words(category, synonyms=CATEGORY_SYNONYMS):
+    """The (plural-folded) words that name category"""
+    return list(dict.fromkeys([singular(t) for t in tokenize(category)] + list(synonyms.get(category, ()))))
+
+
+def category_aliases(products, synonyms=CATEGORY_SYNONYMS, listed=10):
+    """Summary entries per category, keyed by the words that name it, with the listed cheapest products"""
+    by_category = {}
+    for product in products:
+        by_category.setdefault(product.category, []).append(product)
+    aliases = {}
+    for category, items in by_category.items():
+        label = singular(category.lower())
+        items = sorted(items, key=lambda p: (p.price_value is None, p.price_value or 0))
+        offer = ", ".join(f"{p.name} ({p.price})" for p in items[:listed])
+        if len(items) > listed:
+            offer += f" and {len(items) - listed} more"
+        aliases[" ".join(category_words(category, synonyms))] = {
+            "name": f"{label.title()} Selection",
+            "price": f"From {items[0].price}",
+            "features": [],
+            "description": f"We offer {offer}",
+        }
+    return aliases
+
+
+class Catalog:
+    """The whole store: products, sidebar category groupings and the lookup index"""
+
+    def __init__(self, products, synonyms=CATEGORY_SYNONYMS):
+        entries = {}
+        for product in products:
+            entries[product.key] = product
+        self.products = tuple(entries.values())
+        categories = {}
+        for product in self.products:
+            categories.setdefault(product.category, []).append(product.name)
+        self.categories = {category: tuple(names) for category, names in categories.items()}
+        # "phone" -> "Smartphones", for query parsing
+        self.category_words = {word: category for category in self.categories
+                               for word in category_words(category, synonyms)}
+        for key, info in category_aliases(self.products, synonyms).items():
+            entries.setdefault(key, Product(key, **info))
+        self.index = CatalogIndex(entries)
+
+    def __len__(self):
+        return len(self.products)
+
+    def match(self, user_input):
+        return self.index.match(user_input)
+
+
+def product_from_record(record):
+    """Product from a flat record: name, price (display string or number), features, description,
+    category, and optionally key and attributes"""
+    return Product(record.get("key") or record["name"].lower(), record["name"], record["price"],
+                   record.get("features", ()), record.get("description", ""), record["category"],
+                   record.get("attributes"))
+
+
+def inventory_products(inventory):
+    """Products of an inventory grouped as {category: {key: info}}"""
+    for category, items in inventory.items():
+        for key, info in items.items():
+            yield Product(key, category=category, **info)
+
+
+def _json_array_records(f, chunk_size=1 << 16):
+    """Objects of a top-level JSON array, decoded one at a time from chunks of f"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    while True:
+        chunk = f.read(chunk_size)
+        buffer += chunk
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buffer):
+                if buffer[pos] != "[":
+                    raise ValueError("catalog JSON must be an array of product objects")
+                started = True
+                pos += 1
+                continue
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if not chunk:
+                    raise
+                break  # the object continues in the next chunk
+            yield record
+            pos = end
+        buffer = buffer[pos:]
+        if not chunk:
+            if buffer.strip():
+                raise ValueError("truncated catalog JSON")
+            return
+
+
+def iter_records(path):
+    """Product records from a .json array, .jsonl or SQLite (.db/.sqlite) file, read incrementally"""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        import sqlite3
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = db.execute("SELECT key, name, price, features, description, category FROM products ORDER BY rowid")
+            for key, name, price, features, description, category in rows:
+                yield {"key": key, "name": name, "price": price, "features": json.loads(features),
+                       "description": description, "category": category}
+        finally:
+            db.close()
+        return
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _json_array_records(f)
+
+
+def save_catalog(path, products):
+    """Write products in the format load_catalog reads for path's extension"""
+    records = ({"key": p.key, "name": p.name, "price": p.price, "features": list(p.features),
+                "description": p.description, "category": p.category} for p in products)
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        import sqlite3
+        db = sqlite3.connect(path)
+        with db:
+            db.execute("DROP TABLE IF EXISTS products")
+            db.execute("CREATE TABLE products (key TEXT PRIMARY KEY, name TEXT NOT NULL, price TEXT NOT NULL, "
+                       "features TEXT NOT NULL, description TEXT NOT NULL, category TEXT NOT NULL)")
+            db.executemany("INSERT INTO products VALUES (:key, :name, :price, :features, :description, :category)",
+                           ({**r, "features": json.dumps(r["features"])} for r in records))
+        db.close()
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        else:
+            f.write("[\n" + ",\n".join(json.dumps(record) for record in records) + "\n]\n")
+
+
+def load_catalog(path, synonyms=CATEGORY_SYNONYMS):
+    return Catalog((product_from_record(r) for r in iter_records(path)), synonyms)
+
+
+# Structures derived from a catalog (indexes, tables), built ahead of a reload's swap by CatalogStore
+_DERIVED = []
+
+
+def per_catalog(build):
+    """Decorator caching build(catalog) for the last few catalogs used.
+
+    That covers the current one, the previous one (for turns still running
+    on it after a reload) and any catalog a ChatPipeline was given. A
+    missing value is built once, under a lock, while the ones already
+    built are served without it. CatalogStore builds the structures in use
+    for a reloaded catalog before swapping it in, so requests never wait
+    for them.
+    """
+    entries = {}
+    lock = threading.Lock()
+
+    def get(catalog):
+        try:
+            return entries[catalog]
+        except KeyError:
+            pass
+        with lock:
+            if catalog not in entries:
+                value = build(catalog)
+                if len(entries) >= 4:
+                    del entries[next(iter(entries))]
+                entries[catalog] = value
+            return entries[catalog]
+
+    def warm(catalog):
+        """Build for catalog, if this structure has been used at all"""
+        if entries:
+            get(catalog)
+
+    get.warm = warm
+    get.__name__, get.__doc__ = build.__name__, build.__doc__
+    _DERIVED.append(get)
+    return get
+
+
+class CatalogStore:
+    """A catalog file that is reloaded when it changes, without restarting the app.
+
+    get() returns the current Catalog. At most every poll_interval seconds
+    it stats the file; on a new mtime or size a fresh Catalog is built on a
+    background thread and swapped in with a single assignment, so readers
+    always see a complete catalog (the old one until the new one is ready).
+    The structures derived from it (see per_catalog) are built first.
+    A file that fails to load is logged and the old catalog kept. Replace
+    the file atomically (write a temp file, then rename it over the old one).
+    """
+
+    def __init__(self, path, poll_interval=2.0, synonyms=CATEGORY_SYNONYMS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.synonyms = synonyms
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._signature = self._stat()
+        self.catalog = load_catalog(path, synonyms)
+        self._checked = time.monotonic()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked >= self.poll_interval:
+            self._checked = now
+            self.check()
+        return self.catalog
+
+    def check(self, wait=False):
+        """Start a reload if the file changed (on this thread with wait=True); whether one started"""
+        try:
+            signature = self._stat()
+        except OSError:
+            return False
+        with self._lock:
+            if signature == self._signature or self._reloading:
+                return False
+            self._reloading = True
+        if wait:
+            self._reload(signature)
+        else:
+            threading.Thread(target=self._reload, args=(signature,), name="catalog-reload", daemon=True).start()
+        return True
+
+    def _reload(self, signature):
+        catalog = None
+        try:
+            catalog = load_catalog(self.path, self.synonyms)
+        except Exception:
+            logger.exception("Could not reload the catalog from %s; keeping the current one", self.path)
+        if catalog is not None:
+            # Indexes and tables in use are ready before the first request sees the new catalog
+            for derived in list(_DERIVED):
+                try:
+                    derived.warm(catalog)
+                except Exception:
+                    logger.exception("Could not build %s for the reloaded catalog", derived.__name__)
+        with self._lock:
+            if catalog is not None:
+                self.catalog = catalog
+                self.reloads += 1
+            # A broken file is not retried until it changes again
+            self._signature = signature
+            self._reloading = False
+
+
+# Inventory grouped the way the sidebar lists it
+_INVENTORY = {
+    "Smartphones": {
+        "smartx pro phone": {
+            "name": "SmartX Pro Phone",
+            "price": "$899",
+            "features": ["6.1-inch display", "128GB storage", "Triple camera system", "5G enabled", "All-day battery life"],
+            "description": "Premium smartphone perfect for photography and productivity"
+        },
+        "pixelview ultra": {
+            "name": "PixelView Ultra",
+            "price": "$749",
+            "features": ["6.7-inch OLED", "256GB storage", "AI-enhanced camera", "Fast charging", "Water resistant"],
+            "description": "Flagship phone with AI-powered photography"
+        },
+        "ecophone lite": {
+            "name": "EcoPhone Lite",
+            "price": "$399",
+            "features": ["5.8-inch display", "64GB storage", "Dual camera", "All-day battery", "Eco-friendly materials"],
+            "description": "Affordable and sustainable smartphone"
+        },
+        "galaxy s24": {
+            "name": "Samsung Galaxy S24",
+            "price": "$799",
+            "features": ["6.2-inch AMOLED", "128GB storage", "AI camera", "5G", "IP68 water resistance"],
+            "description": "Latest flagship from Samsung with AI features"
+        },
+        "iphone 16": {
+            "name": "iPhone 16",
+            "price": "$999",
+            "features": ["6.3-inch Super Retina XDR", "256GB storage", "A18 chip", "Cinematic mode", "MagSafe"],
+            "description": "Apple's latest innovation for power users"
+        },
+        "oneplus 12": {
+            "name": "OnePlus 12",
+            "price": "$699",
+            "features": ["6.8-inch Fluid AMOLED", "512GB storage", "Snapdragon 8 Gen 3", "Hasselblad camera", "100W fast charge"],
+            "description": "Flagship killer with premium specs at a value price"
+        },
+    },
+    "Cameras": {
+        "fotosnap dslr": {
+            "name": "FotoSnap DSLR Camera",
+            "price": "$1,299",
+            "features": ["24.2MP sensor", "4K video recording", "Weather sealed body", "Dual card slots", "Professional lens mount"],
+            "description": "Professional DSLR camera for serious photographers"
+        },
+        "fotosnap compact": {
+            "name": "FotoSnap Compact Camera",
+            "price": "$599",
+            "features": ["20MP sensor", "10x optical zoom", "WiFi connectivity", "Compact design", "Image stabilization"],
+            "description": "Portable camera with professional features in a compact body"
+        },
+        "actioncam pro": {
+            "name": "ActionCam Pro",
+            "price": "$299",
+            "features": ["4K video", "Waterproof up to 30m", "Image stabilization", "Voice control", "Long battery life"],
+            "description": "Rugged action camera for adventures and sports"
+        },
+        "mirrorless pro": {
+            "name": "Mirrorless Pro X",
+            "price": "$1,499",
+            "features": ["33MP sensor", "8K video", "In-body stabilization", "Touchscreen", "Pro lenses support"],
+            "description": "Next-gen mirrorless for pros and enthusiasts"
+        },
+        "vlog cam": {
+            "name": "Vlog Cam Mini",
+            "price": "$499",
+            "features": ["16MP sensor", "Flip screen", "Audio input", "Live streaming", "Lightweight"],
+            "description": "Perfect for content creators and vloggers"
+        },
+        "drone cam": {
+            "name": "SkyDrone 4K",
+            "price": "$899",
+            "features": ["4K aerial video", "GPS tracking", "Obstacle avoidance", "30min flight time", "App control"],
+            "description": "Capture stunning aerial shots with ease"
+        },
+    },
+    "Televisions": {
+        "tcl 55 tv": {
+            "name": "TCL 55-inch Smart TV",
+            "price": "$649",
+            "features": ["4K Ultra HD", "HDR support", "Smart TV platform", "Multiple HDMI ports", "Voice remote"],
+            "description": "Large screen smart TV with crystal clear picture quality"
+        },
+        "samsung qled": {
+            "name": "Samsung 65-inch QLED TV",
+            "price": "$1,199",
+            "features": ["QLED technology", "8K upscaling", "Voice control", "Gaming mode", "Ambient mode"],
+            "description": "Premium TV with quantum dot technology and smart features"
+        },
+        "budgetview 43": {
+            "name": "BudgetView 43-inch HD TV",
+            "price": "$299",
+            "features": ["Full HD", "Built-in streaming apps", "Slim design", "Energy efficient", "Easy setup"],
+            "description": "Affordable HD TV for small spaces"
+        },
+        "oled 55": {
+            "name": "UltraOLED 55-inch",
+            "price": "$899",
+            "features": ["OLED panel", "True Black", "Dolby Vision", "Game Mode", "Thin bezel"],
+            "description": "Immersive viewing experience with perfect contrast"
+        },
+        "gaming tv": {
+            "name": "GameMaster 65-inch",
+            "price": "$1,099",
+            "features": ["120Hz refresh", "HDMI 2.1", "VRR", "Low input lag", "G-Sync compatible"],
+            "description": "The ultimate gaming TV for competitive players"
+        },
+        "smart tv 75": {
+            "name": "SmartHub 75-inch",
+            "price": "$1,399",
+            "features": ["75-inch 4K", "Voice assistant", "Multi-room audio", "USB-C input", "Wall-mount ready"],
+            "description": "Big screen entertainment center for your living room"
+        },
+    },
+    "Watches": {
+        "watch pro": {
+            "name": "Watch Pro Series",
+            "price": "$399",
+            "features": ["Always-on display", "ECG monitor", "Sleep tracking", "GPS", "5-day battery"],
+            "description": "Advanced health and fitness tracker with premium design"
+        },
+        "sport watch": {
+            "name": "SportFit Watch",
+            "price": "$199",
+            "features": ["Heart rate monitor", "Run tracking", "Water resistant", "Customizable faces", "7-day battery"],
+            "description": "Perfect for athletes and active lifestyles"
+        },
+        "kids watch": {
+            "name": "KidSafe Watch",
+            "price": "$99",
+            "features": ["GPS location", "Emergency call", "Parental controls", "Durable case", "10-day battery"],
+            "description": "Safe and fun wearable for children"
+        },
+        "luxury watch": {
+            "name": "EliteTime Luxury",
+            "price": "$899",
+            "features": ["Stainless steel", "Sapphire glass", "Wireless charging", "Premium leather strap", "Limited edition"],
+            "description": "Luxury smartwatch that combines style and technology"
+        },
+        "fitness band": {
+            "name": "FitBand Plus",
+            "price": "$49",
+            "features": ["Step counter", "Calorie tracker", "Sleep analysis", "Water resistant", "30-day battery"],
+            "description": "Affordable fitness tracker for everyday use"
+        },
+        "smart band": {
+            "name": "SmartBand X",
+            "price": "$79",
+            "features": ["Notifications", "Music control", "Activity reminders", "Color screen", "5-day battery"],
+            "description": "Smart band with advanced features at an entry-level price"
+        },
+    },
+    "Tablets": {
+        "tablet pro": {
+            "name": "Tablet Pro 12.9",
+            "price": "$899",
+            "features": ["12.9-inch display", "M2 chip", "Pencil support", "Face ID", "5G connectivity"],
+            "description": "Professional-grade tablet for creatives and professionals"
+        },
+        "edu tablet": {
+            "name": "EduTab 10.5",
+            "price": "$349",
+            "features": ["10.5-inch display", "Kids mode", "Parental controls", "Durable case", "10-hour battery"],
+            "description": "Perfect for students and educational use"
+        },
+        "budget tablet": {
+            "name": "BudgetPad 8",
+            "price": "$149",
+            "features": ["8-inch display", "Basic apps", "Lightweight", "Long battery", "Simple interface"],
+            "description": "Affordable tablet for casual browsing and media"
+        },
+        "gaming tablet": {
+            "name": "GamePad 11",
+            "price": "$599",
+            "features": ["11-inch high refresh", "Game controller support", "Stereo speakers", "Cooling fan", "Fast charging"],
+            "description": "Powerful tablet designed for mobile gaming"
+        },
+        "creative tablet": {
+            "name": "ArtPad 10",
+            "price": "$499",
+            "features": ["10-inch pen display", "Pressure sensitivity", "Drawing apps", "Color accuracy", "Lightweight"],
+            "description": "Ideal for artists and designers on the go"
+        },
+        "business tablet": {
+            "name": "BizPad 10.2",
+            "price": "$549",
+            "features": ["Office suite", "Security features", "Fingerprint login", "Corporate MDM", "Stylus included"],
+            "description": "Secure and productive tablet for business users"
+        },
+    },
+}
+
+@lru_cache(maxsize=None)
+def get_catalog_store():
+    """The process-wide CatalogStore for $CATALOG_PATH, or None to use the built-in inventory"""
+    path = os.getenv("CATALOG_PATH")
+    return CatalogStore(path) if path else None
+
+
+@lru_cache(maxsize=None)
+def builtin_catalog():
+    return Catalog(inventory_products(_INVENTORY))
+
+
+def get_catalog():
+    """The current process-wide Catalog, shared by every session and rerun; ask again per turn to see reloads"""
+    store = get_catalog_store()
+    return store.get() if store is not None else builtin_catalog()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Write the built-in inventory to a catalog file.")
+    parser.add_argument("path", help="output file: .json, .jsonl or .db")
+    args = parser.parse_args()
+    save_catalog(args.path, builtin_catalog().products)
+    print(f"Wrote {len(builtin_catalog())} products to {args.path}; set CATALOG_PATH to serve it")
+
+
+if __name__ == "__main__":
+    main()
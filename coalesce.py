@@ -0,0 +1,206 @@
+"""Single-flight coalescing of identical in-flight chat completions.
+
+When a promotion sends many users to the same sidebar question at once,
+each of them assembles the same context-free message list and would pay
+for its own identical completion. CoalescingClient wraps an
+OpenAI-compatible client: while a chat completion is in flight, an
+identical request (same messages, model and parameters) does not go
+upstream but waits for the first and receives its response. Streams are
+fanned out chunk by chunk, a late joiner first replaying the chunks
+already received. Nothing is kept once the call is over (that is the
+response cache's job), and requests with different histories never
+share, since the key covers the full message list.
+
+Waiters give up with TimeoutError after ``timeout`` seconds without
+progress. A subscriber closing its stream early only detaches itself;
+the upstream stream is closed once its last subscriber is gone.
+"""
+import contextvars
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+def request_key(kwargs):
+    """Hash of a chat.completions.create call's arguments, all but the timeout"""
+    params = {k: v for k, v in kwargs.items() if k != "timeout"}
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One upstream call and what it has produced so far"""
+
+    __slots__ = ("cond", "chunks", "done", "result", "error", "subscribers", "cancelled")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.subscribers = 0
+        self.cancelled = False
+
+    def publish(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, result=None, error=None):
+        with self.cond:
+            self.result, self.error, self.done = result, error, True
+            self.cond.notify_all()
+
+    def wait(self, timeout):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.done, timeout):
+                raise TimeoutError(f"shared completion not finished after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _SharedStream:
+    """One subscriber's view of a flight's stream: every chunk from the start, then the live ones"""
+
+    def __init__(self, group, key, flight):
+        self._group = group
+        self._key = key
+        self._flight = flight
+        self._closed = False
+
+    def __iter__(self):
+        flight = self._flight
+        seen = 0
+        try:
+            while True:
+                with flight.cond:
+                    if not flight.cond.wait_for(lambda: len(flight.chunks) > seen or flight.done,
+                                                self._group.timeout):
+                        raise TimeoutError(f"no chunk from the shared stream in {self._group.timeout}s")
+                    new = flight.chunks[seen:]
+                    finished = flight.done
+                seen += len(new)
+                yield from new
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._group._unsubscribe(self._key, self._flight)
+
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once and hands every caller the outcome"""
+
+    def __init__(self, timeout=60.0, pump_threads=64):
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        # Streams are drained here, so no single subscriber's pace (or early exit) holds up the others
+        self._pumps = ThreadPoolExecutor(max_workers=pump_threads, thread_name_prefix="coalesce")
+        self.upstream = 0
+        self.shared = 0
+
+    def _join(self, key):
+        """(flight, True if the caller must start it)"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.upstream += 1
+            else:
+                self.shared += 1
+            flight.subscribers += 1
+            return flight, leader
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _unsubscribe(self, key, flight):
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more: stop the upstream stream and let the next request start afresh
+                flight.cancelled = True
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def call(self, key, create, **kwargs):
+        """create(**kwargs), or the result of an identical call already in flight"""
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.wait(self.timeout)
+        try:
+            result = create(**kwargs)
+        except BaseException as error:
+            self._land(key, flight)
+            flight.finish(error=error)
+            raise
+        self._land(key, flight)
+        flight.finish(result=result)
+        return result
+
+    def stream(self, key, create, **kwargs):
+        """An iterable over the chunks of create(**kwargs), shared with identical streams in flight"""
+        flight, leader = self._join(key)
+        if leader:
+            self._pumps.submit(contextvars.copy_context().run, self._pump, key, flight, create, kwargs)
+        return _SharedStream(self, key, flight)
+
+    def _pump(self, key, flight, create, kwargs):
+        stream = None
+        error = None
+        try:
+            stream = create(**kwargs)
+            for chunk in stream:
+                if flight.cancelled:
+                    break
+                flight.publish(chunk)
+        except BaseException as exc:
+            error = exc
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        self._land(key, flight)
+        flight.finish(error=error)
+
+    def stats(self):
+        total = self.upstream + self.shared
+        return {"upstream": self.upstream, "shared": self.shared, "in_flight": len(self._flights),
+                "shared_rate": self.shared / total if total else 0.0}
+
+
+class CoalescingClient:
+    """OpenAI-compatible client whose identical concurrent chat completions share one upstream call"""
+
+    def __init__(self, client, timeout=60.0):
+        self.client = client
+        self.flights = SingleFlight(timeout)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.moderations = client.moderations
+        if hasattr(client, "embeddings"):
+            self.embeddings = client.embeddings
+
+    def _create_completion(self, **kwargs):
+        key = request_key(kwargs)
+        if kwargs.get("stream"):
+            return self.flights.stream(key, self.client.chat.completions.create, **kwargs)
+        return self.flights.call(key, self.client.chat.completions.create, **kwargs)
+
+    def stats(self):
+        stats = self.flights.stats()
+        inner = getattr(self.client, "stats", None)
+        return {**inner(), **stats} if inner else stats
@@ -0,0 +1,119 @@
+"""Token-bounded conversation context.
+
+ContextWindow turns the full chat history into the message list for one
+request: the last few turns stay verbatim, older turns are folded into a
+rolling summary, and the total is kept under a token budget. The summary
+is cached on the window and only extended with the turns that newly fell
+out of the verbatim window, so keep one ContextWindow per conversation.
+"""
+from llm import get_completion
+
+
+def count_tokens(text):
+    """Cheap token estimate (~4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def message_tokens(message, counter=count_tokens):
+    # Each chat message carries a few tokens of role/format overhead
+    return counter(message['content']) + 4
+
+
+def extractive_summary(summary, messages, max_lines=20, max_chars=160):
+    """Append one clipped line per folded message, keeping the most recent max_lines"""
+    lines = summary.splitlines() if summary else []
+    for msg in messages:
+        who = "Customer" if msg['role'] == 'user' else "Sarah"
+        text = " ".join(msg['content'].split())
+        if len(text) > max_chars:
+            text = text[:max_chars].rstrip() + "..."
+        lines.append(f"- {who}: {text}")
+    return "\n".join(lines[-max_lines:])
+
+
+def llm_summarizer(client, max_tokens=200):
+    """Summarizer that asks the model to fold new turns into the running summary"""
+    def summarize(summary, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = [
+            {'role': 'system', 'content': "Update the running summary of a shop conversation. Keep product names, "
+                                          "prices and customer needs; be brief."},
+            {'role': 'user', 'content': f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ]
+        return get_completion(client, prompt, temperature=0, max_tokens=max_tokens)
+    return summarize
+
+
+class ContextWindow:
+    """Per-conversation builder of budgeted request messages"""
+
+    def __init__(self, max_tokens=3000, keep_turns=4, summary_tokens=400,
+                 summarize=extractive_summary, counter=count_tokens):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.counter = counter
+        self.summary = ""
+        self.folded = 0
+        self.tokens_sent = []
+
+    def _fold(self, history, upto):
+        if upto > self.folded:
+            self.summary = self.summarize(self.summary, history[self.folded:upto])
+            self.folded = upto
+
+    def _summary_message(self, limit):
+        """The summary as a system message of at most limit tokens, clipped from the oldest line"""
+        text = self.summary
+        while text:
+            message = {'role': 'system', 'content': f"Earlier in this conversation:\n{text}"}
+            if message_tokens(message, self.counter) <= limit:
+                return message
+            text = text.partition("\n")[2]
+        return None
+
+    def build(self, system_messages, history, user_message, turn_messages=()):
+        """Messages for this request; the token count is appended to tokens_sent.
+
+        turn_messages (e.g. this turn's product context) go right before the
+        user message, after the history, so the earlier messages form a prefix
+        that stays the same from one request to the next.
+        """
+        if len(history) < self.folded:
+            # A different or reset conversation: start over
+            self.summary, self.folded = "", 0
+        self._fold(history, max(0, len(history) - 2 * self.keep_turns))
+
+        # Drop repeated blocks (e.g. the same product rundown pasted twice), keeping the latest copy
+        recent = history[self.folded:]
+        seen = set()
+        verbatim = []
+        # History positions of the verbatim messages, for folding (equal messages can repeat)
+        positions = []
+        for offset in range(len(recent) - 1, -1, -1):
+            msg = recent[offset]
+            if msg['role'] != 'user' and msg['content'] in seen:
+                continue
+            seen.add(msg['content'])
+            verbatim.append(msg)
+            positions.append(self.folded + offset)
+        verbatim.reverse()
+        positions.reverse()
+
+        fixed = sum(message_tokens(m, self.counter) for m in [*system_messages, *turn_messages, user_message])
+        while True:
+            used = fixed + sum(message_tokens(m, self.counter) for m in verbatim)
+            # Recent turns win: the summary only gets what they leave of the budget
+            summary = self._summary_message(min(self.summary_tokens, self.max_tokens - used))
+            total = used + (message_tokens(summary, self.counter) if summary else 0)
+            if total <= self.max_tokens or not verbatim:
+                break
+            # Over budget: fold the oldest verbatim turn into the summary
+            drop = 2 if len(verbatim) > 1 else 1
+            self._fold(history, positions[drop - 1] + 1)
+            verbatim, positions = verbatim[drop:], positions[drop:]
+
+        messages = [*system_messages, *([summary] if summary else []), *verbatim, *turn_messages, user_message]
+        self.tokens_sent.append(total)
+        return messages
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Batch evaluation of the chat pipeline.
+
+Reads test conversations from a JSONL file, one per line:
+
+    {"id": "iphone", "turns": [{"user": "Tell me about the iPhone 16.",
+                                "expected_products": ["iPhone 16"],
+                                "must_include": ["$999"]}]}
+
+Conversations run concurrently (turns within one stay in order) through
+ChatPipeline, with at most --concurrency turns in flight. Each turn is
+scored on product retrieval precision/recall and by a grader (rules, or
+the model with --llm-grader), and the per-turn results are written as
+JSONL or CSV. Use --fake to run offline against FakeOpenAI.
+
+    python evaluate.py eval_conversations.jsonl --fake --report eval_report.jsonl
+"""
+import argparse
+import asyncio
+import csv
+import json
+import random
+import sys
+import time
+
+from context import ContextWindow
+from llm import FALLBACK_RESPONSE, create_client, get_completion
+from pipeline import ChatPipeline
+
+
+def load_conversations(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def score_products(predicted, expected):
+    """(precision, recall) of predicted product names against the expected ones"""
+    predicted, expected = set(predicted), set(expected)
+    hits = len(predicted & expected)
+    precision = hits / len(predicted) if predicted else (1.0 if not expected else 0.0)
+    recall = hits / len(expected) if expected else 1.0
+    return precision, recall
+
+
+def rule_grader(turn, response):
+    """(passed, reason) from simple checks on the reply text"""
+    if response == FALLBACK_RESPONSE:
+        return False, "fallback"
+    lowered = response.lower()
+    missing = [s for s in turn.get("must_include", []) if s.lower() not in lowered]
+    if missing:
+        return False, f"missing {missing}"
+    return True, "ok"
+
+
+def llm_grader(client):
+    """Grader asking the model whether the reply answers the question (as in the notebook)"""
+    def grade(turn, response):
+        messages = [
+            {'role': 'system', 'content': "You evaluate customer service replies. Answer Y or N only."},
+            {'role': 'user', 'content': f"Customer message: ```{turn['user']}```\nAgent response: ```{response}```\n\n"
+                                        "Does the response sufficiently answer the question?"},
+        ]
+        verdict = get_completion(client, messages, temperature=0, max_tokens=1)
+        return verdict.strip().upper().startswith("Y"), verdict.strip()
+    return grade
+
+
+def call_with_retries(fn, retries=3, base_delay=1.0):
+    """Call fn(), retrying errors and fallback replies with jittered exponential backoff.
+
+    The pipeline turns API errors into the fallback reply (after the client's
+    own retries), so that is what a rate-limited or failing turn looks like here.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = fn()
+            if result[0] != FALLBACK_RESPONSE or attempt == retries:
+                return result, attempt
+        except Exception:
+            if attempt == retries:
+                raise
+        time.sleep(base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+async def run_conversation(pipeline, conversation, grader, semaphore, retries):
+    results = []
+    history = []
+    context = ContextWindow()
+    for number, turn in enumerate(conversation["turns"], 1):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                (response, history), attempts = await asyncio.to_thread(
+                    call_with_retries,
+                    lambda: pipeline.process_user_message(turn["user"], history, context=context),
+                    retries,
+                )
+                error = None
+            except Exception as exc:
+                response, attempts, error = "", retries, repr(exc)
+            latency = time.perf_counter() - start
+        product_names = {p.name for p in pipeline.catalog.products}
+        predicted = [p.name for p in pipeline.match_products(turn["user"]) if p.name in product_names]
+        precision, recall = score_products(predicted, turn.get("expected_products", []))
+        passed, reason = (False, error) if error else await asyncio.to_thread(grader, turn, response)
+        results.append({
+            "conversation": conversation["id"], "turn": number, "user": turn["user"], "response": response,
+            "latency_ms": round(latency * 1000, 1), "retries": attempts, "matched_products": predicted,
+            "precision": round(precision, 3), "recall": round(recall, 3), "passed": passed, "reason": reason,
+        })
+    return results
+
+
+async def evaluate(pipeline, conversations, grader, concurrency=8, retries=3):
+    """Per-turn results for every conversation and the wall time it took"""
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    batches = await asyncio.gather(*(
+        run_conversation(pipeline, conversation, grader, semaphore, retries) for conversation in conversations
+    ))
+    return [row for batch in batches for row in batch], time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    latencies = [r["latency_ms"] for r in results]
+    n = len(results)
+    if not n:
+        return {"turns": 0, "conversations": 0, "wall_s": round(elapsed, 2)}
+    return {
+        "turns": n,
+        "conversations": len({r["conversation"] for r in results}),
+        "pass_rate": round(sum(r["passed"] for r in results) / n, 3),
+        "precision": round(sum(r["precision"] for r in results) / n, 3),
+        "recall": round(sum(r["recall"] for r in results) / n, 3),
+        "throughput_turns_per_s": round(n / elapsed, 2),
+        "latency_ms_p50": percentile(latencies, 50),
+        "latency_ms_p95": percentile(latencies, 95),
+        "latency_ms_p99": percentile(latencies, 99),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def write_report(path, results):
+    """JSONL, or CSV when path ends in .csv"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if not results:
+            return
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows({**r, "matched_products": "; ".join(r["matched_products"])} for r in results)
+        else:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+
+def make_client(args):
+    if args.fake:
+        from fake_openai import FakeOpenAI
+        return FakeOpenAI(first_token_delay=args.fake_latency, moderation_delay=args.fake_latency / 4)
+    client = create_client()
+    if client is None:
+        sys.exit("Missing OPENAI_API_KEY (or pass --fake to run offline)")
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-evaluate the chat pipeline on JSONL test conversations.")
+    parser.add_argument("conversations", nargs="?", default="eval_conversations.jsonl")
+    parser.add_argument("--report", default="eval_report.jsonl", help="per-turn results (.jsonl or .csv)")
+    parser.add_argument("--concurrency", type=int, default=8, help="max turns in flight")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--llm-grader", action="store_true", help="grade with the model instead of rules")
+    parser.add_argument("--fake", action="store_true", help="use the offline FakeOpenAI client")
+    parser.add_argument("--fake-latency", type=float, default=0.2, help="FakeOpenAI completion delay in seconds")
+    args = parser.parse_args(argv)
+
+    client = make_client(args)
+    grader = llm_grader(client) if args.llm_grader else rule_grader
+    conversations = load_conversations(args.conversations)
+    results, elapsed = asyncio.run(evaluate(ChatPipeline(client), conversations, grader, args.concurrency, args.retries))
+    write_report(args.report, results)
+    print(json.dumps(summarize(results, elapsed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
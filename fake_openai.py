@@ -0,0 +1,268 @@
+"""Offline stand-in for the OpenAI client, for benchmarks and local runs.
+
+FakeOpenAI answers ``chat.completions.create`` (blocking or ``stream=True``)
+and ``moderations.create`` with canned data and configurable delays, so the
+chat pipeline can be exercised without a network or an API key.
+
+Delays are seconds, or a Latency distribution ("lognormal:0.3,0.5") that is
+sampled per call, so load tests see realistic spread.
+
+FakeOpenAIServer serves the same answers over HTTP on localhost, in the
+API's wire format, and can inject errors and outages; point the real
+``openai.OpenAI`` at its ``base_url`` to exercise timeouts, retries and
+connection handling end to end.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+def keyword_reply(messages):
+    """Canned answer to the latest user message, like the notebook stub"""
+    user_message = ""
+    for msg in reversed(messages):
+        if msg['role'] == 'user':
+            user_message = msg['content'].lower()
+            break
+    if {"hi", "hello", "hey"} & set(re.findall(r"[a-z]+", user_message)):
+        return "Hello! How can I **assist** you today?"
+    elif "phone" in user_message:
+        return "We offer several phones, including the *SmartX Pro* and the iPhone 16. Would you like more details?"
+    elif "camera" in user_message:
+        return "Our camera selection includes the **FotoSnap DSLR** and FotoSnap Compact. Interested in specs or pricing?"
+    elif "tv" in user_message:
+        return "We have a range of TVs, including TCL and Samsung models. What size are you looking for?"
+    elif "thank" in user_message:
+        return "You're welcome! If you have any more questions, just ask."
+    elif "bye" in user_message:
+        return "Goodbye! Have a great day."
+    return "Happy to help! Could you tell me a bit more about what you are looking for?"
+
+
+class Latency:
+    """A seeded latency distribution; calling it draws one delay in seconds.
+
+    spec is "fixed:S", "uniform:LOW,HIGH", "normal:MEAN,SD", "lognormal:MEDIAN,SIGMA"
+    or "exp:MEAN" (a bare number means fixed). Samples are never negative.
+    """
+
+    KINDS = {
+        "fixed": lambda rng, s: s,
+        "uniform": lambda rng, low, high: rng.uniform(low, high),
+        "normal": lambda rng, mean, sd: rng.gauss(mean, sd),
+        "lognormal": lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma),
+        "exp": lambda rng, mean: rng.expovariate(1 / mean),
+    }
+
+    def __init__(self, spec, seed=0):
+        self.spec = str(spec)
+        kind, _, params = self.spec.partition(":") if ":" in self.spec else ("fixed", "", self.spec)
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown latency distribution {kind!r} (one of {', '.join(self.KINDS)})")
+        self._sample = self.KINDS[kind]
+        self._params = [float(p) for p in params.split(",")]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return max(0.0, self._sample(self._rng, *self._params))
+
+    def __repr__(self):
+        return f"Latency({self.spec!r})"
+
+
+def _seconds(delay):
+    return delay() if callable(delay) else delay
+
+
+class FakeOpenAI:
+    """Mimics the parts of ``openai.OpenAI`` the chatbot uses.
+
+    reply is a string or a callable(messages) -> str. Streaming splits the
+    reply into chunk_size-character deltas; first_token_delay is paid once
+    per completion and token_delay per delta, so blocking calls take the
+    full generation time and streams show the first delta early. Each delay
+    may be a Latency (or any callable) to draw it per call.
+    Inputs containing any of flagged_words are flagged by moderation.
+    """
+
+    def __init__(self, reply=keyword_reply, chunk_size=4, first_token_delay=0.0, token_delay=0.0,
+                 moderation_delay=0.0, flagged_words=()):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.moderation_delay = moderation_delay
+        self.flagged_words = tuple(w.lower() for w in flagged_words)
+        self.calls = {"chat": 0, "moderation": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.moderations = SimpleNamespace(create=self._create_moderation)
+
+    def _reply_text(self, messages):
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _chunks(self, text):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _create_completion(self, model, messages, stream=False, **kwargs):
+        self.calls["chat"] += 1
+        text = self._reply_text(messages)
+        if stream:
+            return self._stream(text)
+        time.sleep(_seconds(self.first_token_delay) + _seconds(self.token_delay) * len(self._chunks(text)))
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=text), finish_reason="stop")],
+            # Rough counts (~4 characters per token), in the shape the API reports them
+            usage=SimpleNamespace(prompt_tokens=sum(len(m['content']) for m in messages) // 4,
+                                  completion_tokens=len(text) // 4),
+        )
+
+    def _stream(self, text):
+        time.sleep(_seconds(self.first_token_delay))
+        for i, piece in enumerate(self._chunks(text)):
+            if i:
+                time.sleep(_seconds(self.token_delay))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece), finish_reason=None)])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason="stop")])
+
+    def _create_moderation(self, input, **kwargs):
+        self.calls["moderation"] += 1
+        time.sleep(_seconds(self.moderation_delay))
+        inputs = input if isinstance(input, list) else [input]
+        return SimpleNamespace(results=[
+            SimpleNamespace(flagged=any(w in text.lower() for w in self.flagged_words), categories={})
+            for text in inputs
+        ])
+
+
+class FakeOpenAIServer:
+    """HTTP server for /v1/chat/completions and /v1/moderations, answering from a FakeOpenAI.
+
+    A fraction error_rate of requests fails with a status drawn from
+    error_statuses (429s carry a Retry-After of retry_after seconds);
+    while ``down`` is set every request gets a 503. ``requests`` counts
+    what reached the server.
+
+        with FakeOpenAIServer(FakeOpenAI(first_token_delay=0.1), error_rate=0.2) as server:
+            client = openai.OpenAI(api_key="test", base_url=server.base_url)
+    """
+
+    def __init__(self, fake=None, error_rate=0.0, error_statuses=(429, 500, 503), retry_after=0.05, seed=0,
+                 host="127.0.0.1", port=0):
+        self.fake = fake if fake is not None else FakeOpenAI()
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.down = False
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _injected_error(self):
+        """Status to fail this request with, or None to answer it"""
+        with self._lock:
+            self.requests += 1
+            if self.down:
+                return 503
+            if self._random.random() < self.error_rate:
+                return self._random.choice(self.error_statuses)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length") or 0)) or b"{}")
+                status = server._injected_error()
+                if status is not None:
+                    headers = {"retry-after": str(server.retry_after)} if status == 429 else {}
+                    self.send_json(status, {"error": {"message": "injected failure", "type": "server_error"}},
+                                   headers)
+                elif self.path.endswith("/chat/completions"):
+                    self.completion(body)
+                elif self.path.endswith("/moderations"):
+                    response = server.fake.moderations.create(input=body["input"])
+                    self.send_json(200, {"id": "modr-fake", "model": "fake", "results": [
+                        {"flagged": r.flagged, "categories": r.categories, "category_scores": {}}
+                        for r in response.results
+                    ]})
+                else:
+                    self.send_json(404, {"error": {"message": "not found"}})
+
+            def completion(self, body):
+                created = int(time.time())
+                base = {"id": "chatcmpl-fake", "created": created, "model": body.get("model", "fake")}
+                if not body.get("stream"):
+                    response = server.fake.chat.completions.create(model=base["model"], messages=body["messages"])
+                    self.send_json(200, {**base, "object": "chat.completion", "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": response.choices[0].message.content},
+                    }]})
+                    return
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+                self.end_headers()
+                for chunk in server.fake.chat.completions.create(model=base["model"], messages=body["messages"],
+                                                                 stream=True):
+                    choice = chunk.choices[0]
+                    delta = {"content": choice.delta.content} if choice.delta.content is not None else {}
+                    self.send_chunk({**base, "object": "chat.completion.chunk", "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": choice.finish_reason},
+                    ]})
+                self.send_chunk("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def send_chunk(self, payload):
+                data = payload if isinstance(payload, str) else json.dumps(payload)
+                event = f"data: {data}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                self.wfile.flush()
+
+            def send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,257 @@
+"""Structured product search: "a camera under $500", "cheapest 3 phones with 256GB".
+
+parse_query() pulls the constraints out of a question: category, price
+range, attribute bounds (storage_gb, screen_inches, battery_days, ...), an
+ordering ("cheapest", "biggest screen") and how many to show. ProductTable
+keeps the catalog's numbers as NumPy columns, so a range filter is a few
+vectorized comparisons and the top N a partial sort, even at 100k SKUs.
+NumPy is imported when the first table is built, so parsing alone stays
+light.
+"""
+import math
+import re
+
+from catalog import ATTRIBUTE_PATTERNS, get_catalog, per_catalog, singular, tokenize
+
+DEFAULT_LIMIT = 5
+
+_NUMBER = r"\$?\s*(\d[\d,]*(?:\.\d+)?)(?![\d,])\s*(k\b)?"
+# A number followed by a unit is an attribute, not a price
+_NO_UNIT = r"(?!\s*(?:gb|tb|mp|inch|in\b|\"|-?\s*day|-?\s*hour|%|x\b))"
+_PRICE_RANGE_RE = re.compile(r"between\s+" + _NUMBER + r"\s+and\s+" + _NUMBER + _NO_UNIT
+                             + r"|\$\s*(\d[\d,]*)\s*(?:-|to)\s*\$?\s*(\d[\d,]*)", re.I)
+_PRICE_MAX_RE = re.compile(r"(?:under|below|less than|cheaper than|at most|up to|no more than|max(?:imum)?|"
+                           r"within|<=?)\s*" + _NUMBER + _NO_UNIT, re.I)
+_PRICE_MIN_RE = re.compile(r"(?:over|above|more than|at least|starting at|min(?:imum)?|>=?)\s*" + _NUMBER
+                           + _NO_UNIT, re.I)
+_PRICE_ABOUT_RE = re.compile(r"(?:around|about|roughly|approximately|~)\s*" + _NUMBER + _NO_UNIT, re.I)
+_BUDGET_RE = re.compile(r"budget (?:of|is)\s*" + _NUMBER + _NO_UNIT, re.I)
+
+_AT_LEAST = r"(?:at least|over|above|more than|min(?:imum)?|bigger than|larger than|longer than)"
+_AT_MOST = r"(?:under|below|less than|at most|up to|max(?:imum)?|smaller than|shorter than)"
+_UNITS = {"storage_gb": r"(?P<unit>gb|tb)\b", "screen_inches": r"(?:-\s*)?(?:inch(?:es)?|in\b|\")",
+          "battery_days": r"-?\s*days?\b", "battery_hours": r"-?\s*hours?\b", "megapixels": r"mp\b"}
+_ATTRIBUTE_RES = {
+    attribute: re.compile(rf"(?:(?P<cmp>{_AT_LEAST}|{_AT_MOST})\s*)?(?P<value>\d+(?:\.\d+)?)\s*{unit}"
+                          r"(?P<suffix>\s*(?:\+|or more|or less))?", re.I)
+    for attribute, unit in _UNITS.items()
+}
+# "N days" alone is a return window or shipping time; battery life needs the word next to it,
+# as in ATTRIBUTE_PATTERNS ("7-day battery", "10 hours of battery", "battery life over 5 days")
+_BATTERY_BEFORE = re.compile(r"\bbattery(?:\s+life)?(?:\s+(?:of|is|lasts?|lasting|that lasts))?\s*:?\s*$", re.I)
+_BATTERY_AFTER = re.compile(r"\s*(?:of\s+)?battery\b", re.I)
+_CONTEXT = {"battery_days": (_BATTERY_BEFORE, _BATTERY_AFTER), "battery_hours": (_BATTERY_BEFORE, _BATTERY_AFTER)}
+# Default reading of a bare "256GB phone" / "55-inch TV"
+_BARE = {"storage_gb": "min", "screen_inches": "about", "battery_days": "min", "battery_hours": "min",
+         "megapixels": "min"}
+
+_SORTS = [
+    (re.compile(r"\b(?:cheapest|least expensive|lowest[- ]priced?|most affordable)\b", re.I),
+     ("price", False)),
+    (re.compile(r"\b(?:most expensive|priciest|highest[- ]end|top[- ]of[- ]the[- ]line)\b", re.I), ("price", True)),
+    (re.compile(r"\b(?:biggest|largest|bigger|larger)\b(?:\s+\w+)?\s+(?:screen|display|tv|television)|"
+                r"\b(?:biggest|largest)\b", re.I), ("screen_inches", True)),
+    (re.compile(r"\b(?:most|more|max(?:imum)?|biggest|largest)\s+storage\b", re.I), ("storage_gb", True)),
+    (re.compile(r"\b(?:longest|best|longer)\s+battery\b", re.I), ("battery_days", True)),
+]
+_COUNT_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                "nine": 9, "ten": 10}
+_LIMIT_RE = re.compile(r"\b(?:top|best|cheapest|first)\s+(\d+|" + "|".join(_COUNT_WORDS) + r")\b|"
+                       r"\b(\d+|" + "|".join(_COUNT_WORDS) + r")\s+(?:cheapest|best|top|most)\b", re.I)
+
+
+def _amount(number, thousands=None):
+    value = float(number.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+class Query:
+    """Constraints parsed from a question; bounds are inclusive and None when open"""
+
+    __slots__ = ("category", "min_price", "max_price", "attributes", "sort", "limit")
+
+    def __init__(self, category=None, min_price=None, max_price=None, attributes=None, sort=None, limit=None):
+        self.category = category
+        self.min_price = min_price
+        self.max_price = max_price
+        self.attributes = attributes or {}  # attribute -> (low, high)
+        self.sort = sort  # (attribute or "price", descending)
+        self.limit = limit
+
+    @property
+    def structured(self):
+        """Whether the question asks for filtering or ranking, beyond naming products.
+
+        A ranking with no category ("which has more storage?") is a follow-up
+        about products already discussed, so it does not count.
+        """
+        return (self.min_price is not None or self.max_price is not None or bool(self.attributes)
+                or (self.sort is not None and self.category is not None))
+
+    def accepts(self, product):
+        if self.category is not None and product.category != self.category:
+            return False
+        for value, (low, high) in [(product.price_value, (self.min_price, self.max_price))] + [
+                (product.attributes.get(a), bounds) for a, bounds in self.attributes.items()]:
+            if low is None and high is None:
+                continue
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def __repr__(self):
+        fields = {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) not in (None, {})}
+        return f"Query({', '.join(f'{k}={v!r}' for k, v in fields.items())})"
+
+
+def parse_query(text, catalog=None):
+    """The Query expressed by text: category, price range, attribute bounds, ordering and count"""
+    catalog = catalog if catalog is not None else get_catalog()
+    query = Query()
+    for token in tokenize(text):
+        category = catalog.category_words.get(singular(token))
+        if category is not None:
+            query.category = category
+            break
+
+    found = _PRICE_RANGE_RE.search(text)
+    if found:
+        if found.group(1):
+            low, high = _amount(found.group(1), found.group(2)), _amount(found.group(3), found.group(4))
+        else:
+            low, high = _amount(found.group(5)), _amount(found.group(6))
+        query.min_price, query.max_price = min(low, high), max(low, high)
+    else:
+        for pattern, side in ((_PRICE_MAX_RE, "max"), (_BUDGET_RE, "max"), (_PRICE_MIN_RE, "min")):
+            found = pattern.search(text)
+            if found:
+                setattr(query, f"{side}_price", _amount(found.group(1), found.group(2)))
+        found = _PRICE_ABOUT_RE.search(text)
+        if found and query.min_price is None and query.max_price is None:
+            amount = _amount(found.group(1), found.group(2))
+            query.min_price, query.max_price = amount * 0.85, amount * 1.15
+
+    for attribute, pattern in _ATTRIBUTE_RES.items():
+        found = _attribute_match(attribute, pattern, text)
+        if not found:
+            continue
+        value = float(found.group("value"))
+        if (found.groupdict().get("unit") or "").lower() == "tb":
+            value *= 1024
+        comparator = (found.group("cmp") or "").lower()
+        suffix = (found.group("suffix") or "").strip().lower()
+        if comparator and re.fullmatch(_AT_MOST, comparator) or suffix == "or less":
+            query.attributes[attribute] = (None, value)
+        elif comparator or suffix in ("+", "or more") or _BARE[attribute] == "min":
+            query.attributes[attribute] = (value, None)
+        else:
+            query.attributes[attribute] = (value - 0.5, value + 0.5)
+
+    for pattern, sort in _SORTS:
+        if pattern.search(text):
+            query.sort = sort
+            break
+    found = _LIMIT_RE.search(text)
+    if found:
+        count = (found.group(1) or found.group(2)).lower()
+        query.limit = _COUNT_WORDS.get(count) or int(count)
+        if query.sort is None and re.search(r"\b(?:top|best)\b", found.group(0), re.I):
+            query.sort = ("price", True)
+    return query
+
+
+def _attribute_match(attribute, pattern, text):
+    """The first mention of attribute in text, with the context word it needs next to it, if any"""
+    context = _CONTEXT.get(attribute)
+    for found in pattern.finditer(text):
+        if context is None:
+            return found
+        before, after = context
+        if before.search(text, 0, found.start()) or after.match(text, found.end()):
+            return found
+    return None
+
+
+class ProductTable:
+    """The catalog's products as NumPy columns (price, each attribute, category code) for fast filtering"""
+
+    def __init__(self, products):
+        import numpy as np
+        self.products = tuple(products)
+        categories = sorted({p.category for p in self.products})
+        self.category_codes = {category: code for code, category in enumerate(categories)}
+        self.category = np.array([self.category_codes[p.category] for p in self.products], dtype=np.int32)
+        self.columns = {"price": np.array([_number(p.price_value) for p in self.products], dtype=np.float64)}
+        for attribute in ATTRIBUTE_PATTERNS:
+            self.columns[attribute] = np.array([_number(p.attributes.get(attribute)) for p in self.products],
+                                               dtype=np.float64)
+
+    def __len__(self):
+        return len(self.products)
+
+    def mask(self, query):
+        """Boolean row mask of the products satisfying query (unknown values never satisfy a bound)"""
+        import numpy as np
+        mask = np.ones(len(self.products), dtype=bool)
+        if query.category is not None:
+            code = self.category_codes.get(query.category)
+            if code is None:
+                return np.zeros(len(self.products), dtype=bool)
+            mask &= self.category == code
+        for column, (low, high) in [("price", (query.min_price, query.max_price)), *query.attributes.items()]:
+            values = self.columns[column]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+    def search(self, query, limit=None):
+        """Up to limit products satisfying query, ordered by query.sort (cheapest first by default)"""
+        import numpy as np
+        limit = limit or query.limit or DEFAULT_LIMIT
+        rows = np.flatnonzero(self.mask(query))
+        column, descending = query.sort or ("price", False)
+        keys = self.columns[column][rows]
+        # Unknown values sort last either way
+        keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+        if len(rows) > limit:
+            top = np.argpartition(keys, limit - 1)[:limit]
+            rows, keys = rows[top], keys[top]
+        order = np.argsort(keys, kind="stable")
+        return [self.products[i] for i in rows[order]]
+
+
+def _number(value):
+    return math.nan if value is None else value
+
+
+@per_catalog
+def _table(catalog):
+    return ProductTable(catalog.products)
+
+
+def get_product_table(catalog=None):
+    """ProductTable over catalog, by default the current one (rebuilt after a catalog reload)"""
+    return _table(catalog if catalog is not None else get_catalog())
+
+
+def structured_matches(query, named=(), table=None):
+    """Products answering a structured query.
+
+    Without a category, products named in the question are the answer
+    ("is the iPhone 16 under $1000?"), fitting or not. Otherwise named
+    products that fit come first, then the best others from the table.
+    """
+    table = table if table is not None else get_product_table()
+    limit = query.limit or DEFAULT_LIMIT
+    named = [p for p in named if p.category is not None]
+    if query.category is None and named:
+        return named[:limit]
+    chosen = [p for p in named if query.accepts(p)][:limit]
+    for product in table.search(query, limit):
+        if len(chosen) >= limit:
+            break
+        if product not in chosen:
+            chosen.append(product)
+    return chosen
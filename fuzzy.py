@@ -0,0 +1,188 @@
+"""Typo-tolerant, ranked product lookup over a precomputed character trigram index.
+
+CatalogIndex only finds whole tokens: "iphon 16" and "fotosnapp" miss the
+product names, and a lone generic word ("pro", "watch") pulls in every
+product that has it. FuzzyIndex reuses its token postings and adds:
+
+- character trigrams of every alphabetic token of the product names and
+  aliases. A query word of four letters or more is compared, by edit
+  distance, only with the tokens that share enough trigrams with it.
+  Tokens with digits ("s24", "16") must match exactly, since a model
+  number one keystroke away is a different product;
+- joined neighbours, so "one plus" and "foto snap" find OnePlus and FotoSnap;
+- IDF weights normalized to [0, 1]: 1 for a token naming a single
+  product, 0 for one every product has. Generic tokens count for little,
+  except that a category word ("tablet", "tv") always scores its category
+  summary entry in full, so "Do you sell tablets?" still finds it.
+
+A product scores the weighted similarity of the tokens the query matched
+(1.0 for an exact one). It is returned if that reaches ``threshold`` and
+``relative`` times the best score. Tokens in more than ``max_postings``
+products only add to products found through rarer ones, which keeps
+lookups sub-millisecond on large catalogs; a query made of such tokens
+alone matches nothing.
+"""
+import math
+from bisect import bisect_left
+from collections import Counter
+
+from catalog import get_catalog, per_catalog, singular, tokenize
+from retrieval import STOP_WORDS
+
+
+def trigrams(token):
+    """Character trigrams of token padded with a space on each side"""
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b (adjacent swaps cost 1), or limit + 1 if above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Equal ends cost nothing; a typo usually leaves only a few letters in between
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class FuzzyIndex:
+    """Ranked, typo-tolerant lookup over the tokens of a CatalogIndex"""
+
+    def __init__(self, catalog_index, category_words=(), threshold=0.6, relative=0.5, max_postings=1000,
+                 min_length=4):
+        self.products = catalog_index.products
+        self.postings = catalog_index.postings
+        self.category_words = frozenset(category_words)
+        # Category summary entries ("Tablet Selection") have no category of their own
+        self.summaries = tuple(pos for pos, product in enumerate(self.products) if product.category is None)
+        self.threshold = threshold
+        self.relative = relative
+        self.max_postings = max_postings
+        self.min_length = min_length
+        total = max(len(self.products), 2)
+        self.weights = {token: max(0.0, math.log(total / len(hits)) / math.log(total))
+                        for token, hits in self.postings.items()}
+        # One edit from a min_length query word can be a token a letter shorter
+        self.vocabulary = [token for token in self.postings if token.isalpha() and len(token) >= min_length - 1]
+        self.gram_counts = [len(trigrams(token)) for token in self.vocabulary]
+        grams = {}
+        for number, token in enumerate(self.vocabulary):
+            for gram in trigrams(token):
+                grams.setdefault(gram, []).append(number)
+        self.grams = {gram: tuple(numbers) for gram, numbers in grams.items()}
+
+    def __len__(self):
+        return len(self.products)
+
+    def terms(self, text):
+        """Singular query tokens, each pair of neighbours joined where the joint word is indexed ("one plus")"""
+        words = tokenize(text)
+        terms = []
+        i = 0
+        while i < len(words):
+            if i + 1 < len(words):
+                joined = singular(words[i] + words[i + 1])
+                if joined in self.postings:
+                    terms.append(joined)
+                    i += 2
+                    continue
+            terms.append(singular(words[i]))
+            i += 1
+        return terms
+
+    def expand(self, term):
+        """{indexed token: similarity} for one query term: itself if indexed, else its closest spellings"""
+        if term in self.postings:
+            return {term: 1.0}
+        if len(term) < self.min_length or not term.isalpha() or term in STOP_WORDS:
+            return {}
+        limit = 1 if len(term) < 8 else 2
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            numbers = self.grams.get(gram)
+            if numbers:
+                shared.update(numbers)
+        found = {}
+        # Most shared trigrams first; once a match is found only as close ones are kept, which raises the bar
+        for number, count in shared.most_common():
+            # An edit changes at most three trigrams (four for a swap): fewer in common cannot be within limit
+            if count < len(grams) - 4 * limit:
+                break
+            if count < self.gram_counts[number] - 4 * limit:
+                continue
+            token = self.vocabulary[number]
+            distance = edit_distance(term, token, limit)
+            if distance < limit and found:
+                found.clear()
+            if distance <= limit:
+                limit = distance
+                found[token] = 1.0 - distance / max(len(term), len(token))
+        return found
+
+    def search(self, text, threshold=None, relative=None):
+        """[(product, score)] for the products text names, best first"""
+        threshold = self.threshold if threshold is None else threshold
+        relative = self.relative if relative is None else relative
+        matched = {}
+        for term in self.terms(text):
+            for token, similarity in self.expand(term).items():
+                matched[token] = max(matched.get(token, 0.0), similarity)
+        scores = {}
+        common = []
+        for token, similarity in matched.items():
+            hits = self.postings[token]
+            weight = self.weights[token] * similarity
+            if token in self.category_words:
+                # Its summary entry scores similarity in full: the remainder on top of the weight added below
+                for pos in self.summaries:
+                    i = bisect_left(hits, pos)
+                    if i < len(hits) and hits[i] == pos:
+                        scores[pos] = scores.get(pos, 0.0) + similarity - weight
+            if len(hits) > self.max_postings:
+                common.append((hits, weight))
+                continue
+            for pos in hits:
+                scores[pos] = scores.get(pos, 0.0) + weight
+        for hits, weight in common:
+            for pos in scores:
+                i = bisect_left(hits, pos)
+                if i < len(hits) and hits[i] == pos:
+                    scores[pos] += weight
+        if not scores:
+            return []
+        floor = max(threshold, relative * max(scores.values()))
+        ranked = sorted((pos for pos, score in scores.items() if score >= floor), key=lambda pos: (-scores[pos], pos))
+        return [(self.products[pos], scores[pos]) for pos in ranked]
+
+    def match(self, user_input):
+        """Products user_input names, best match first"""
+        return [product for product, _ in self.search(user_input)]
+
+
+def get_fuzzy_index(catalog=None):
+    """FuzzyIndex over catalog, by default the current one (rebuilt after a catalog reload)"""
+    return _fuzzy_index(catalog if catalog is not None else get_catalog())
+
+
+@per_catalog
+def _fuzzy_index(catalog):
+    return FuzzyIndex(catalog.index, catalog.category_words)
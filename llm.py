@@ -0,0 +1,270 @@
+"""Chat-completion helpers shared by the Streamlit app and offline tools.
+
+Every function takes the OpenAI-compatible client explicitly, so the same
+code runs against ``openai.OpenAI`` or ``fake_openai.FakeOpenAI``.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_RESPONSE = "I apologize, but I'm experiencing technical difficulties. Please try again in a moment."
+REFUSAL_RESPONSE = "I'm sorry, but I can't assist with that type of request. Please ask about our products in a respectful manner."
+
+
+class StreamInterrupted(Exception):
+    """A streamed completion failed after part of the reply was shown"""
+
+
+class PartialReply(str):
+    """Reply text cut short by a failed stream: shown and kept in the history, but never cached"""
+
+
+# Shared by every session: moderation and completions overlap on these threads
+_executor = ThreadPoolExecutor(max_workers=256, thread_name_prefix="llm")
+
+
+def create_client(api_key=None, timeout=30.0, max_retries=3, max_concurrency=64, coalesce=True,
+                  moderation_window=0.015, moderation_batch=32, moderation_cache=1024, **resilience):
+    """Resilient OpenAI client for api_key or $OPENAI_API_KEY (looked up in .env too); None when there is no key.
+
+    Build it once per process and share it: the underlying HTTP connection
+    pool, the circuit breaker, the concurrency limit, (with coalesce) the
+    in-flight requests identical ones can join and the moderation batches
+    are per instance. Moderation inputs arriving within moderation_window
+    seconds share a call of up to moderation_batch inputs (None disables
+    batching). Extra keyword arguments go to resilience.ResilientClient.
+    """
+    if api_key is None:
+        from dotenv import load_dotenv, find_dotenv
+        load_dotenv(find_dotenv(usecwd=True))
+        api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    from openai import OpenAI
+    from resilience import ResilientClient
+    # Retries live in ResilientClient, where they share the breaker and limiter
+    client = OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+    client = ResilientClient(client, timeout=timeout, max_retries=max_retries, max_concurrency=max_concurrency,
+                             **resilience)
+    if coalesce:
+        from coalesce import CoalescingClient
+        # Outside the retries, so duplicates also share one retry loop; waiters allow for all of its attempts
+        client = CoalescingClient(client, timeout=timeout * (max_retries + 1))
+    if moderation_window is not None:
+        from moderation import BatchedModerationClient
+        client = BatchedModerationClient(client, window=moderation_window, max_batch=moderation_batch,
+                                         cache_size=moderation_cache, timeout=timeout * (max_retries + 1))
+    return client
+
+
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_RE = re.compile(r'\*(.*?)\*')
+
+
+def _strip_markdown(text):
+    return _ITALIC_RE.sub(r'\1', _BOLD_RE.sub(r'\1', text))
+
+
+def clean_response(text):
+    """Remove markdown like *italic* and **bold**"""
+    return _strip_markdown(text).strip()
+
+
+class StreamCleaner:
+    """Apply clean_response to a stream of deltas without waiting for the end.
+
+    Markdown pairs never span a newline ('.' in the patterns stops at one),
+    so finished lines are cleaned right away; the open line is emitted up
+    to its first '*' and the rest is held until it can be resolved.
+    Trailing whitespace is held back too, so the joined output equals
+    clean_response(full_text).
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self._held_space = ""
+        self._started = False
+
+    def feed(self, delta):
+        """Add a raw delta; return the cleaned text that is now safe to show"""
+        self._pending += delta
+        cut = self._pending.rfind("\n") + 1
+        done, tail = self._pending[:cut], self._pending[cut:]
+        star = tail.find("*")
+        if star != -1:
+            done, tail = done + tail[:star], tail[star:]
+        else:
+            done, tail = done + tail, ""
+        self._pending = tail
+        return self._emit(_strip_markdown(done))
+
+    def finish(self):
+        """Flush whatever is still buffered at the end of the stream"""
+        text = self._emit(_strip_markdown(self._pending))
+        self._pending = self._held_space = ""
+        return text
+
+    def _emit(self, text):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        body = text.rstrip()
+        out = self._held_space + body if body else ""
+        self._held_space = text[len(body):] if body else self._held_space + text
+        return out
+
+
+def moderate(client, text):
+    """Check for inappropriate content using the Moderation API; (flagged, categories).
+
+    Errors propagate: a failed check must never read as "not flagged".
+    """
+    with span("llm.moderation") as s:
+        response = client.moderations.create(input=text)
+        result = response.results[0]
+        s.set(flagged=bool(result.flagged))
+    return result.flagged, result.categories
+
+
+def _rejection(verdict):
+    """None if the moderation future passed the text, else the reply to give instead"""
+    try:
+        flagged = verdict.result()[0]
+    except Exception as error:
+        # Fail closed: an unchecked input is not answered
+        logger.warning("Moderation unavailable, refusing the turn: %r", error)
+        return FALLBACK_RESPONSE
+    return REFUSAL_RESPONSE if flagged else None
+
+
+def get_completion(client, messages, model="gpt-3.5-turbo", temperature=0.7, max_tokens=500):
+    """Blocking completion; returns the whole reply text, cleaned like stream_completion's deltas"""
+    try:
+        with span("llm.completion", model=model) as s:
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                s.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        return clean_response(response.choices[0].message.content)
+    except Exception as error:
+        logger.warning("Completion failed: %r", error)
+        return FALLBACK_RESPONSE
+
+
+def stream_completion(client, messages, model="gpt-3.5-turbo", temperature=0.7, max_tokens=500):
+    """Yield cleaned text deltas as the model produces them.
+
+    If the request fails before anything was shown, the usual apology is
+    yielded instead; a failure mid-stream raises StreamInterrupted once the
+    deltas so far are out, so the cut-short reply is not taken for a whole one.
+    """
+    cleaner = StreamCleaner()
+    shown = False
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = cleaner.feed(chunk.choices[0].delta.content or "")
+                if text:
+                    shown = True
+                    yield text
+        finally:
+            # Also runs when the consumer stops early, releasing the HTTP stream
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+    except Exception as error:
+        logger.warning("Streamed completion failed: %r", error)
+        if not shown:
+            yield FALLBACK_RESPONSE
+            return
+        text = cleaner.finish()
+        if text:
+            yield text
+        raise StreamInterrupted(repr(error)) from error
+    text = cleaner.finish()
+    if text:
+        yield text
+
+
+def moderated_completion(client, user_input, messages, on_delta=None, moderate_output=False, **completion_kwargs):
+    """Moderate user_input while the completion is already being generated.
+
+    Returns (flagged, text). When the input is flagged the reply is dropped
+    (a stream is closed as soon as the verdict arrives) and REFUSAL_RESPONSE
+    comes back; when moderation itself fails, the turn is rejected the same
+    way with FALLBACK_RESPONSE. With on_delta, the reply streams but nothing reaches
+    on_delta until the input has passed. moderate_output also checks the
+    finished reply; it then has to be complete before it can be shown, so
+    on_delta gets it in one piece. A stream that fails midway returns what
+    arrived as a PartialReply.
+    """
+    # copy_context() keeps the caller's open span as the parent of the worker's spans
+    verdict = _executor.submit(contextvars.copy_context().run, moderate, client, user_input)
+
+    if on_delta is None or moderate_output:
+        reply = _executor.submit(contextvars.copy_context().run, get_completion, client, messages, **completion_kwargs)
+        rejection = _rejection(verdict)
+        if rejection is not None:
+            reply.cancel()
+            return True, rejection
+        text = reply.result()
+        if moderate_output:
+            rejection = _rejection(_executor.submit(contextvars.copy_context().run, moderate, client, text))
+            if rejection is not None:
+                return True, rejection
+        if on_delta is not None:
+            on_delta(text)
+        return False, text
+
+    text = ""
+    shown = 0
+    complete = True
+    stream = stream_completion(client, messages, **completion_kwargs)
+    with span("llm.stream") as s:
+        start = time.perf_counter()
+        try:
+            for delta in stream:
+                if not text:
+                    s.set(first_delta_ms=round((time.perf_counter() - start) * 1000, 2))
+                text += delta
+                if verdict.done():
+                    if verdict.exception() is not None or verdict.result()[0]:
+                        break
+                    shown = len(text)
+                    on_delta(text)
+        except StreamInterrupted:
+            complete = False
+        finally:
+            stream.close()
+        s.set(completion_chars=len(text), complete=complete)
+    if not complete:
+        text = PartialReply(text)
+    rejection = _rejection(verdict)
+    if rejection is not None:
+        return True, rejection
+    if shown < len(text):
+        on_delta(text)
+    return False, text
@@ -0,0 +1,166 @@
+"""Micro-batched moderation shared by every session in a process.
+
+The moderation endpoint accepts a list of inputs, so under load one
+round-trip per user turn is wasted. BatchedModerationClient wraps an
+OpenAI-compatible client and gathers the single-input
+``moderations.create`` calls made within ``window`` seconds of each other
+(or until ``max_batch`` are waiting) into one list call. It then hands each
+caller its own result, in the same response shape, so llm.moderate works
+unchanged. Recent verdicts are kept in a small LRU keyed on the exact
+text, and a text that reappears is answered without a call. A failed batch
+raises in every one of its callers, so moderation still fails closed.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+
+class VerdictCache:
+    """LRU of moderation results by input text"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        with self._lock:
+            result = self._entries.get(text)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return result
+
+    def set(self, text, result):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[text] = result
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _fail(futures, error):
+    """Raise error in the callers waiting on futures that have no outcome yet"""
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+
+class ModerationBatcher:
+    """Turns concurrent single-text checks into batched moderations.create(input=[...]) calls"""
+
+    def __init__(self, create, window=0.015, max_batch=32, cache_size=1024, timeout=60.0, max_in_flight=8):
+        self.create = create
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.cache = VerdictCache(cache_size)
+        self._queue = queue.Queue()
+        # Batches are sent from here, so the next one is gathered while earlier ones are in flight
+        self._senders = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="moderation")
+        self._dispatcher = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.items = 0
+
+    def check(self, text, **kwargs):
+        """The moderation result for text (raises if its batch failed)"""
+        result = self.cache.get(text)
+        if result is not None:
+            return result
+        if self._dispatcher is None:
+            self._start()
+        future = Future()
+        self._queue.put((text, kwargs, future))
+        return future.result(self.timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="moderation-batcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                # Calls with different options (say, another model) cannot share a request
+                groups = {}
+                for text, kwargs, future in batch:
+                    groups.setdefault(tuple(sorted(kwargs.items())), []).append((text, kwargs, future))
+                for entries in groups.values():
+                    self._senders.submit(self._send, entries[0][1], [(text, future) for text, _, future in entries])
+            except Exception as error:
+                # This batch fails; the dispatcher lives on for the next one
+                _fail([future for _, _, future in batch], error)
+
+    def _send(self, kwargs, entries):
+        waiting = {}
+        for text, future in entries:
+            waiting.setdefault(text, []).append(future)
+        texts = list(waiting)
+        with self._stats_lock:
+            self.calls += 1
+            self.items += len(texts)
+        try:
+            results = self.create(input=texts, **kwargs).results
+            if len(results) != len(texts):
+                raise ValueError(f"moderation returned {len(results)} results for {len(texts)} inputs")
+            for text, result in zip(texts, results):
+                self.cache.set(text, result)
+                for future in waiting[text]:
+                    if not future.done():
+                        future.set_result(result)
+        except Exception as error:
+            _fail([future for futures in waiting.values() for future in futures], error)
+
+    def stats(self):
+        with self._stats_lock:
+            calls, items = self.calls, self.items
+        return {"calls": calls, "items": items, "mean_batch": items / calls if calls else 0.0,
+                "cache_hits": self.cache.hits, "cache_size": len(self.cache)}
+
+
+class BatchedModerationClient:
+    """OpenAI-compatible client whose single-input moderation calls are micro-batched (see ModerationBatcher)"""
+
+    def __init__(self, client, window=0.015, max_batch=32, cache_size=1024, timeout=60.0):
+        self.client = client
+        self.batcher = ModerationBatcher(client.moderations.create, window=window, max_batch=max_batch,
+                                         cache_size=cache_size, timeout=timeout)
+        self.chat = client.chat
+        self.moderations = SimpleNamespace(create=self._create_moderation)
+        if hasattr(client, "embeddings"):
+            self.embeddings = client.embeddings
+
+    def _create_moderation(self, input, **kwargs):
+        if isinstance(input, list):
+            # Already a batch: send as is
+            return self.client.moderations.create(input=input, **kwargs)
+        return SimpleNamespace(results=[self.batcher.check(input, **kwargs)])
+
+    def stats(self):
+        inner = getattr(self.client, "stats", None)
+        return {**(inner() if inner else {}), "moderation": self.batcher.stats()}
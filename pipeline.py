@@ -0,0 +1,142 @@
+"""The chat pipeline, independent of any UI.
+
+ChatPipeline bundles the client, catalog, response cache and local intent
+router and answers one user turn at a time. It holds no per-conversation
+state (that lives in the history and the ContextWindow the caller passes
+in), so one instance can serve every session in a process.
+"""
+from catalog import get_catalog, singular, tokenize
+from context import ContextWindow, count_tokens
+from filtering import get_product_table, parse_query, structured_matches
+from fuzzy import get_fuzzy_index
+from llm import FALLBACK_RESPONSE, PartialReply, moderated_completion
+from prompts import SYSTEM_MESSAGE, SYSTEM_PROMPT, generate_product_information, product_context_message
+from response_cache import cache_key
+from retrieval import get_vector_index, semantic_matches
+from tracing import span
+
+
+def find_category_and_product_only(user_input, index):
+    """The products mentioned in user_input, best match first (index is a FuzzyIndex or CatalogIndex)"""
+    return index.match(user_input)
+
+
+class ChatPipeline:
+    """Matches products, builds the prompt, moderates and completes one user turn"""
+
+    def __init__(self, client, catalog=None, cache=None, semantic=True, router=None):
+        self.client = client
+        self._catalog = catalog
+        self.cache = cache
+        self.semantic = semantic
+        # IntentRouter answering greetings, thanks, listings and price lookups without the model
+        self.router = router
+
+    @property
+    def catalog(self):
+        """The catalog passed in, else the process catalog as of now (it may have been reloaded)"""
+        return self._catalog if self._catalog is not None else get_catalog()
+
+    def warm_up(self):
+        """Build the lazily created indexes (and import NumPy) now rather than in the first turn"""
+        catalog = self.catalog
+        get_product_table(catalog)
+        get_fuzzy_index(catalog)
+        if self.semantic:
+            get_vector_index(catalog)
+
+    def match_products(self, user_input):
+        """Products for a question with constraints ("camera under $500"), else (or if none fit) keyword
+        matches plus embedding neighbours not already found"""
+        catalog = self.catalog
+        index = get_fuzzy_index(catalog)
+        query = parse_query(user_input, catalog)
+        if query.structured:
+            # Only the handful that satisfy the constraints reach the prompt. A category word ("cameras")
+            # names no product, so it must not put every "... Camera" ahead of the sorted results
+            words = [t for t in tokenize(user_input) if singular(t) not in catalog.category_words]
+            matched = structured_matches(query, named=find_category_and_product_only(" ".join(words), index),
+                                         table=get_product_table(catalog))
+            if matched:
+                return matched
+        matched = find_category_and_product_only(user_input, index)
+        if self.semantic:
+            # Embedding neighbours catch descriptive asks like "something for my kid's homework"
+            matched += [p for p in semantic_matches(user_input, catalog=catalog) if p not in matched]
+        return matched
+
+    def process_user_message(self, user_input, all_messages, debug=False, on_delta=None, moderate_output=False,
+                             context=None):
+        """Answer user_input; with on_delta, stream the reply and call on_delta(text_so_far) as it grows.
+
+        context is the conversation's ContextWindow, which bounds the history sent
+        with the request; pass the same one every turn so its summary is reused.
+        """
+        with span("pipeline.turn", history_messages=len(all_messages)) as turn:
+            return self._process(turn, user_input, all_messages, debug, on_delta, moderate_output, context)
+
+    def _process(self, turn, user_input, all_messages, debug, on_delta, moderate_output, context):
+        routed = self.router.route(user_input, self.catalog) if self.router is not None else None
+        if routed is not None:
+            if debug: print(f"Step 1: Answered locally ({routed.intent}).")
+            turn.set(local=True, intent=routed.intent)
+            if on_delta is not None:
+                on_delta(routed.response)
+            return routed.response, all_messages + [
+                {'role': 'user', 'content': user_input},
+                {'role': 'assistant', 'content': routed.response}
+            ]
+
+        with span("pipeline.match") as s:
+            matched = self.match_products(user_input)
+            product_info = generate_product_information(matched)
+            s.set(products=len(matched))
+
+        # Recent turns verbatim, older ones summarized, all within the token budget
+        if context is None:
+            context = ContextWindow()
+        with span("pipeline.prompt") as s:
+            # Constant persona prefix first; only the product context changes per turn
+            messages = context.build(
+                [SYSTEM_MESSAGE],
+                all_messages,
+                {'role': 'user', 'content': user_input},
+                turn_messages=[product_context_message(product_info)]
+            )
+            s.set(prompt_tokens=context.tokens_sent[-1])
+        if debug: print(f"Step 3: Built prompt ({context.tokens_sent[-1]} tokens).")
+
+        # Context-free questions can reuse an earlier answer (it already passed moderation)
+        cache = self.cache if not all_messages else None
+        key = cache_key(user_input, matched, SYSTEM_PROMPT, product_info) if cache else None
+        final_response = cache.get(key) if cache else None
+        turn.set(products=len(matched), prompt_tokens=context.tokens_sent[-1], cache_hit=final_response is not None)
+        if final_response is not None:
+            if debug: print("Step 4: Served response from cache.")
+            if on_delta is not None:
+                on_delta(final_response)
+        else:
+            # Input moderation runs alongside the completion; a flagged input discards the reply
+            with span("pipeline.respond", streamed=on_delta is not None) as s:
+                flagged, final_response = moderated_completion(
+                    self.client, user_input, messages, on_delta=on_delta, moderate_output=moderate_output
+                )
+                s.set(refused=flagged)
+            if flagged:
+                if debug: print("Step 1: Moderation API flagged the turn.")
+                turn.set(refused=True)
+                return final_response, all_messages
+            if debug: print("Step 4: Generated response to user question.")
+            # Neither the apology nor a reply cut short by a failed stream is an answer worth reusing
+            if cache and final_response != FALLBACK_RESPONSE and not isinstance(final_response, PartialReply):
+                cache.set(key, final_response)
+        # Estimated; llm.completion spans carry the API's own counts when it reports them
+        turn.set(completion_tokens=count_tokens(final_response))
+
+        # Update conversation history
+        updated_messages = all_messages + [
+            {'role': 'user', 'content': user_input},
+            {'role': 'assistant', 'content': final_response}
+        ]
+
+        return final_response, updated_messages
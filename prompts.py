@@ -0,0 +1,57 @@
+"""Prompt pieces for the sales assistant.
+
+The persona and guidelines are one constant system message, so every
+request starts with the same prefix and provider-side prompt caching can
+reuse it. The products relevant to a turn go in a separate, small message
+placed just before the user's question; each product's block is rendered
+once and memoized.
+"""
+from functools import lru_cache
+
+SYSTEM_PROMPT = """
+You are Sarah, a knowledgeable sales representative at TechStore Electronics.
+
+YOUR ROLE:
+- You are a human employee working in our physical store
+- You have the exact products listed under "SPECIFIC PRODUCTS WE HAVE IN STOCK" available for purchase
+- You know all the details, prices, and features listed there
+- You help customers find the perfect product for their needs
+
+RESPONSE GUIDELINES:
+- Always mention specific product names and exact prices from our inventory
+- Highlight key features that match customer needs
+- Ask relevant follow-up questions to better help customers
+- Compare products when customers are deciding between options
+- Be enthusiastic about our products while being honest about their capabilities
+- Never say "I don't have inventory" or mention being an AI
+
+CONVERSATION STYLE:
+- Friendly and professional
+- Product-focused and helpful
+- Ask questions to understand customer needs better
+- Provide specific recommendations with reasons why
+
+When customers ask about products, reference our exact inventory with names, prices, and features.
+"""
+
+# Shared by every request; never mutate it
+SYSTEM_MESSAGE = {'role': 'system', 'content': SYSTEM_PROMPT}
+
+NO_MATCH_INFORMATION = "I don't see any specific products matching your request, but I can tell you about our full inventory of phones, cameras, TVs, watches, and tablets."
+
+
+@lru_cache(maxsize=8192)
+def render_product(product):
+    """The prompt block for one product (Products are immutable, so this never goes stale)"""
+    return f"{product['name']} - {product['price']}\nDescription: {product['description']}\nKey Features: {', '.join(product['features'])}"
+
+
+def generate_product_information(matched_products):
+    if not matched_products:
+        return NO_MATCH_INFORMATION
+    return "\n\n".join([render_product(p) for p in matched_products])
+
+
+def product_context_message(product_info):
+    """The per-turn message carrying the products relevant to this question"""
+    return {'role': 'system', 'content': f"SPECIFIC PRODUCTS WE HAVE IN STOCK:\n{product_info}"}
@@ -0,0 +1,197 @@
+"""Retries, timeouts, a circuit breaker and a concurrency cap for API calls.
+
+ResilientClient wraps an OpenAI-compatible client and exposes the same
+``chat.completions.create``, ``moderations.create`` and
+``embeddings.create``, so llm.py and retrieval.py use it unchanged. Every
+call gets an explicit timeout; transient failures (429, 5xx, timeouts,
+dropped connections) are retried with jittered exponential backoff that
+waits at least as long as the server's Retry-After. After
+``failure_threshold`` consecutive transient failures the breaker opens and
+calls fail at once with CircuitOpenError until ``reset_timeout`` has passed
+and a trial call succeeds. One instance is meant to be shared by every
+session in a process, so its limiter bounds the requests in flight upstream.
+"""
+import logging
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is known to be down"""
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait, if the error carries a Retry-After header"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value) * scale
+        except ValueError:
+            # An HTTP date; fall back to our own backoff
+            return None
+    return None
+
+
+def is_transient(error):
+    """Whether error is worth retrying: throttling, a server error, a timeout or a lost connection"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUSES
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    # openai.APIConnectionError and its APITimeoutError subclass carry no status
+    return any(cls.__name__ == "APIConnectionError" for cls in type(error).__mro__)
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout.
+
+    While half-open a single trial call goes through; its success closes the
+    breaker, its failure opens it again. A non-transient error (a 400, say)
+    shows the upstream is answering and counts as a success.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("Circuit opened after %d consecutive failures", self.failures)
+                self.opened_at = self.clock()
+            self._trial = False
+
+
+class _LimitedStream:
+    """A streaming response that holds a limiter slot until it is exhausted or closed"""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            close = getattr(self._stream, "close", None)
+            if close:
+                close()
+            release()
+
+
+class ResilientClient:
+    """OpenAI-compatible client adding per-call timeouts, retries, a circuit breaker and a concurrency cap"""
+
+    def __init__(self, client, timeout=30.0, max_retries=3, base_delay=0.5, max_delay=20.0, breaker=None,
+                 max_concurrency=64):
+        self.client = client
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.limiter = threading.BoundedSemaphore(max_concurrency)
+        self.attempts = 0
+        self.retries = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=lambda **kwargs: self.call(client.chat.completions.create, **kwargs)
+        ))
+        self.moderations = SimpleNamespace(create=lambda **kwargs: self.call(client.moderations.create, **kwargs))
+        if hasattr(client, "embeddings"):
+            self.embeddings = SimpleNamespace(create=lambda **kwargs: self.call(client.embeddings.create, **kwargs))
+
+    def call(self, create, **kwargs):
+        """create(**kwargs) with a timeout, retried on transient errors; streams keep their slot until closed"""
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("upstream unavailable; not calling it until the circuit resets")
+            self.limiter.acquire()
+            self.attempts += 1
+            try:
+                result = create(**kwargs)
+            except Exception as error:
+                self.limiter.release()
+                if not is_transient(error):
+                    # The upstream answered (say, a 400): it is up, and a half-open trial must not stay pending
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                delay = self._delay(error, attempt)
+                if delay is None:
+                    raise
+                logger.info("Retrying %s in %.2fs after %r", getattr(create, "__qualname__", "call"), delay, error)
+                self.retries += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if kwargs.get("stream"):
+                return _LimitedStream(result, self.limiter.release)
+            self.limiter.release()
+            return result
+
+    def _delay(self, error, attempt):
+        """Seconds to wait before the next attempt, or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        asked = retry_after(error)
+        if asked is not None:
+            if asked > self.max_delay:
+                return None
+            delay = max(delay, asked)
+        return delay
+
+    def stats(self):
+        return {"attempts": self.attempts, "retries": self.retries, "circuit": self.breaker.state}
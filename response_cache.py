@@ -0,0 +1,140 @@
+"""Response cache for context-free questions.
+
+Answers are keyed on the normalized question, the set of matched products,
+their rendered details (prices, features, ...) and a hash of the system
+prompt, so a catalog or prompt change never serves a stale answer. Entries
+expire after ``ttl`` seconds and the least recently used ones are evicted
+past ``max_entries``. The storage backend is pluggable: MemoryBackend (per
+process) or SQLiteBackend (shared on disk).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from catalog import tokenize
+
+
+def normalize_query(text):
+    """Case, spacing and punctuation-insensitive form of a question"""
+    return " ".join(tokenize(text))
+
+
+def cache_key(user_input, matched_products, system_prompt, product_info=""):
+    """product_info is the product text the prompt carries: a reloaded price changes it, and so the key"""
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    info_hash = hashlib.sha256(product_info.encode("utf-8")).hexdigest()
+    names = sorted(p["name"] for p in matched_products)
+    raw = json.dumps([normalize_query(user_input), names, prompt_hash, info_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU + TTL store"""
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created = entry
+            if time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU + TTL store in a SQLite file, shared by every process that opens it"""
+
+    def __init__(self, path, max_entries=10000, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Front for a backend that keeps hit/miss counters"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.backend),
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def cache_from_env():
+    """In-memory cache, or a SQLite one at $RESPONSE_CACHE_PATH so several processes share it"""
+    path = os.getenv("RESPONSE_CACHE_PATH")
+    return ResponseCache(SQLiteBackend(path) if path else MemoryBackend())
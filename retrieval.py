@@ -0,0 +1,156 @@
+"""Embedding-based product retrieval.
+
+Catalog entries (name, category, description, features) are embedded once
+into a row-normalized float32 matrix; a query is scored against every row
+with one matrix-vector product and the top k are picked with argpartition.
+The matrix can be saved and reopened memory-mapped, so large catalogs are
+not re-embedded on every start.
+
+Any callable taking a list of texts and returning an (n, dim) array can be
+used as the embedder. HashingEmbedder runs offline (TF-IDF weighted
+feature hashing); OpenAIEmbedder calls the embeddings endpoint.
+
+NumPy is imported on first use, not with the module, so importing the
+pipeline stays cheap for processes that never search.
+"""
+import math
+import zlib
+
+from catalog import get_catalog, per_catalog, singular, tokenize
+
+STOP_WORDS = frozenset(
+    "a an and any are as at be best can do does for from have i in is it me my of on or our "
+    "some something that the this to what which with you your".split()
+)
+
+
+# The shipped index's width. At 100k SKUs a lookup takes about 40 ms (p50) and the matrix 390 MiB
+# (benchmarks/bench_retrieval.py); 256 is about 3x faster, but its hash collisions cut precision on
+# the evaluation set from 0.69 to 0.55
+DEFAULT_DIM = 1024
+
+
+def product_text(product):
+    """The text a product is embedded from"""
+    return " ".join((product.name, product.category or "", product.description, " ".join(product.features)))
+
+
+def _normalize_rows(matrix):
+    import numpy as np
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class HashingEmbedder:
+    """Offline embedder: signed hashing of words and word bigrams into dim buckets.
+
+    Call fit() on the corpus to weight features by inverse document
+    frequency; unfitted, every feature weighs 1.
+    """
+
+    def __init__(self, dim=DEFAULT_DIM, stop_words=STOP_WORDS):
+        self.dim = dim
+        self.stop_words = stop_words
+        self.idf = {}
+        self.default_idf = 1.0
+
+    def _features(self, text):
+        # Single letters are mostly possessive leftovers ("kid's" -> "kid", "s")
+        words = [singular(t) for t in tokenize(text)
+                 if t not in self.stop_words and (len(t) > 1 or t.isdigit())]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def fit(self, texts):
+        df = {}
+        for text in texts:
+            for feature in set(self._features(text)):
+                df[feature] = df.get(feature, 0) + 1
+        n = len(texts)
+        self.idf = {feature: math.log((1 + n) / (1 + count)) + 1 for feature, count in df.items()}
+        self.default_idf = 0.0  # words the corpus never uses cannot match anything
+        return self
+
+    def __call__(self, texts):
+        import numpy as np
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                weight = self.idf.get(feature, self.default_idf)
+                matrix[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        return _normalize_rows(matrix)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API (needs network and a key)"""
+
+    def __init__(self, client, model="text-embedding-3-small", batch_size=512):
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+
+    def __call__(self, texts):
+        import numpy as np
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(model=self.model, input=list(texts[start:start + self.batch_size]))
+            rows.extend(item.embedding for item in response.data)
+        return _normalize_rows(np.asarray(rows, dtype=np.float32))
+
+
+class VectorIndex:
+    """Row i of the matrix is the embedding of items[i]"""
+
+    def __init__(self, items, matrix, embedder):
+        if len(items) != matrix.shape[0]:
+            raise ValueError(f"{len(items)} items but {matrix.shape[0]} embeddings")
+        self.items = list(items)
+        self.matrix = matrix
+        self.embedder = embedder
+
+    @classmethod
+    def build(cls, items, embedder, text=product_text):
+        import numpy as np
+        return cls(items, np.ascontiguousarray(embedder([text(item) for item in items]), dtype=np.float32), embedder)
+
+    def save(self, path):
+        import numpy as np
+        np.save(path, self.matrix)
+
+    @classmethod
+    def load(cls, path, items, embedder):
+        """Reopen a saved matrix memory-mapped; items must be in the order it was built from"""
+        import numpy as np
+        return cls(items, np.load(path, mmap_mode="r"), embedder)
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, query, k=5, min_score=0.0):
+        """[(item, cosine score)] for the k best rows scoring above min_score, best first"""
+        import numpy as np
+        scores = self.matrix @ self.embedder([query])[0]
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.items[i], float(scores[i])) for i in top if scores[i] > min_score]
+
+
+def get_vector_index(catalog=None):
+    """Index over catalog's products, by default the current catalog's (rebuilt after a catalog reload)"""
+    return _vector_index(catalog if catalog is not None else get_catalog())
+
+
+@per_catalog
+def _vector_index(catalog):
+    products = catalog.products
+    embedder = HashingEmbedder().fit([product_text(p) for p in products])
+    return VectorIndex.build(products, embedder)
+
+
+def semantic_matches(user_input, k=3, min_score=0.15, catalog=None):
+    """Products of catalog (by default the current one) closest to user_input in embedding space"""
+    return [product for product, _ in get_vector_index(catalog).search(user_input, k=k, min_score=min_score)]
@@ -0,0 +1,144 @@
+"""Answers simple turns locally, without a model call.
+
+IntentRouter recognizes a few kinds of message outright: greetings,
+thanks, farewells, "list all X" and the price of one named product. It
+answers them from the catalog with a template. Each rule has a confidence;
+turns under the router's threshold (and every turn no rule fully
+matches) go to the model as before. Rules match the whole message, so
+"Hi! I'm looking for a fitness tracker" is not a greeting. Because
+nothing but the recognized words gets through, routed turns need no
+moderation call either.
+"""
+import os
+import re
+from collections import Counter
+
+from catalog import get_catalog, per_catalog, singular, tokenize
+
+# Lists longer than this end with "...and N more"
+LIST_LIMIT = 10
+
+_END = r"\s*[.!?]*\s*"
+_NAME = r"(?:\s*,?\s*(?:sarah|there|everyone|all))?"
+_GREETING_RE = re.compile(r"(?:hi+|hello|hey+|hiya|howdy|greetings|good (?:morning|afternoon|evening)|"
+                          r"hi there|hey there)" + _NAME + _END, re.I)
+_THANKS_RE = re.compile(r"(?:(?:ok(?:ay)?|great|perfect|awesome|cool|nice)\s*,?\s*)?"
+                        r"(?:thanks?(?: you)?|thx|ty|cheers|much appreciated)"
+                        r"(?: (?:so|very) much| a lot| a bunch)?(?: for (?:the|your) help)?" + _NAME + _END, re.I)
+_FAREWELL_RE = re.compile(r"(?:(?:(?:ok(?:ay)?|great|perfect)\s*,?\s*)?(?:thanks?(?: you)?(?: so much)?\s*[,.!]?\s*)?)"
+                          r"(?:good ?bye|bye(?: bye)?|see (?:you|ya)(?: later| soon)?|that'?s all(?: for now)?|"
+                          r"have a (?:nice|good|great) (?:day|evening|one))" + _NAME + _END, re.I)
+_LIST_RE = re.compile(r"(?:(?:please|can you|could you)\s+)*(?:list|show(?: me)?|what are)\s+(?:all|every)(?: of)?"
+                      r"(?: the| your)?\s+(?P<what>[\w\s-]+?)(?: you (?:have|sell|carry))?(?: in stock)?"
+                      + _END, re.I)
+_WHAT_DO_YOU_HAVE_RE = re.compile(r"(?:what|which)(?: kinds? of| types? of)?\s+(?P<what>[\w\s-]+?)\s+"
+                                  r"(?:do you (?:have|sell|carry|stock)|are (?:available|in stock))" + _END, re.I)
+_PRICE_RES = [
+    re.compile(r"(?:how much (?:is|are|does|do|for)|what(?:'s| is) the (?:price|cost) (?:of|for)|"
+               r"(?:price|cost) (?:of|for))\s+(?:the |an? )?(?P<product>.+?)(?:\s+cost)?" + _END, re.I),
+    re.compile(r"(?:the |an? )?(?P<product>.+?)\s+price" + _END, re.I),
+]
+
+TEMPLATES = {
+    "greeting": "Hello! I'm Sarah from TechStore. Are you looking for a phone, camera, TV, watch or tablet today? "
+                "Tell me what you need and I'll find the right fit.",
+    "thanks": "You're welcome! If you have any more questions, just ask.",
+    "farewell": "Goodbye, and thanks for visiting TechStore! Have a great day.",
+    "list": "Here {verb} the {count} {category} we carry:\n\n{lines}{more}\n\n"
+            "Would you like details on any of them, or help choosing?",
+    "list_line": "- {name}: {price}",
+    "list_more": "\n- ...and {count} more",
+    "price": "The {name} is {price}. Would you like to hear about its features, or compare it with similar "
+             "{category}?",
+}
+
+
+class Route:
+    """A locally answered turn"""
+
+    __slots__ = ("intent", "response", "confidence")
+
+    def __init__(self, intent, response, confidence):
+        self.intent = intent
+        self.response = response
+        self.confidence = confidence
+
+    def __repr__(self):
+        return f"Route({self.intent!r}, {self.confidence})"
+
+
+@per_catalog
+def _lookup(catalog):
+    """Products by lowercased name and key, and each category's products"""
+    names, by_category = {}, {}
+    for product in catalog.products:
+        names.setdefault(product.key.lower(), (product, 0.95))
+        by_category.setdefault(product.category, []).append(product)
+    for product in catalog.products:
+        names[product.name.lower()] = (product, 1.0)
+    return names, by_category
+
+
+def _category(words, catalog):
+    """The category every token of words names ("phones", "smartphones", "tvs"), or None"""
+    categories = {catalog.category_words.get(singular(t)) for t in tokenize(words)}
+    return categories.pop() if len(categories) == 1 else None
+
+
+class IntentRouter:
+    """Matches a message against the local intents; route() returns a Route, or None for the model"""
+
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self.counts = Counter()
+
+    def classify(self, text, catalog):
+        """The best local Route for text, whatever its confidence, or None"""
+        text = " ".join(text.split())
+        if _FAREWELL_RE.fullmatch(text):
+            return Route("farewell", TEMPLATES["farewell"], 1.0)
+        if _THANKS_RE.fullmatch(text):
+            return Route("thanks", TEMPLATES["thanks"], 1.0)
+        if _GREETING_RE.fullmatch(text):
+            return Route("greeting", TEMPLATES["greeting"], 1.0)
+        for pattern, confidence in ((_LIST_RE, 0.95), (_WHAT_DO_YOU_HAVE_RE, 0.85)):
+            found = pattern.fullmatch(text)
+            category = found and _category(found.group("what"), catalog)
+            if category:
+                return Route("list", self.list_response(category, catalog), confidence)
+        for pattern in _PRICE_RES:
+            found = pattern.fullmatch(text)
+            hit = found and _lookup(catalog)[0].get(found.group("product").lower())
+            if hit:
+                product, confidence = hit
+                return Route("price", TEMPLATES["price"].format(
+                    name=product.name, price=product.price, category=product.category.lower()), confidence)
+        return None
+
+    def list_response(self, category, catalog):
+        products = _lookup(catalog)[1].get(category, [])
+        lines = "\n".join(TEMPLATES["list_line"].format(name=p.name, price=p.price) for p in products[:LIST_LIMIT])
+        more = TEMPLATES["list_more"].format(count=len(products) - LIST_LIMIT) if len(products) > LIST_LIMIT else ""
+        return TEMPLATES["list"].format(verb="is" if len(products) == 1 else "are", count=len(products),
+                                        category=category.lower(), lines=lines, more=more)
+
+    def route(self, text, catalog=None):
+        """The Route answering text locally, or None when the model should (no rule, or under threshold)"""
+        routed = self.classify(text, catalog if catalog is not None else get_catalog())
+        if routed is None or routed.confidence < self.threshold:
+            self.counts["model"] += 1
+            return None
+        self.counts[routed.intent] += 1
+        return routed
+
+    def stats(self):
+        total = sum(self.counts.values())
+        local = total - self.counts["model"]
+        return {"turns": total, "local": local, "local_rate": local / total if total else 0.0,
+                "intents": {k: v for k, v in self.counts.items() if k != "model"}}
+
+
+def router_from_env():
+    """IntentRouter with threshold $LOCAL_ROUTER_THRESHOLD (default 0.8), or None when it is "off" """
+    threshold = os.getenv("LOCAL_ROUTER_THRESHOLD", "0.8")
+    return None if threshold.lower() in ("off", "none", "") else IntentRouter(float(threshold))
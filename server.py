@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Headless HTTP API for the chat pipeline (plain ASGI, no web framework).
+
+    POST /chat  {"message": "...", "session_id": "optional"}
+
+streams the reply as server-sent events: one ``delta`` event per chunk of
+text, then a ``done`` event with the session id, the full reply and
+``refused`` (true when moderation rejected the turn and history was left
+unchanged). Send ``"stream": false`` to get that payload as plain JSON.
+
+Sessions (history + ContextWindow state) live in a SessionStore keyed by
+session id: in memory by default, or in SQLite / JSONL files at
+$SESSION_STORE_PATH so every worker process can resume any session (see
+sessions.py). Turns of one session are serialized within a process,
+different sessions run concurrently.
+
+GET /metrics serves per-stage timings in Prometheus' text format when
+TRACE_SINKS includes "prometheus" (see tracing.py).
+
+    uvicorn server:create_app --factory --workers 4
+    python server.py --fake --port 8000     # offline, against FakeOpenAI
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import ChatPipeline
+from response_cache import cache_from_env
+from router import router_from_env
+from sessions import SessionStore, check_id, session_store_from_env
+from tracing import PrometheusSink, configure_from_env, get_tracer
+
+
+class ChatServer:
+    """ASGI app serving one ChatPipeline to many sessions"""
+
+    def __init__(self, pipeline, store=None, max_sessions=10000, workers=256):
+        self.pipeline = pipeline
+        self.store = store if store is not None else SessionStore()
+        self.max_sessions = max_sessions
+        self.locks = OrderedDict()
+        # The pipeline is blocking; turns run on these threads
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat")
+
+    def lock(self, session_id):
+        """Lock serializing session_id's turns, forgetting the least recently used idle ones past max_sessions"""
+        lock = self.locks.get(session_id)
+        if lock is None:
+            lock = self.locks[session_id] = asyncio.Lock()
+            if len(self.locks) > self.max_sessions:
+                # A held lock must stay, or a second turn of its session could run alongside the first
+                idle = [key for key, held in self.locks.items() if not held.locked()]
+                for key in idle[:len(self.locks) - self.max_sessions]:
+                    del self.locks[key]
+        self.locks.move_to_end(session_id)
+        return lock
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    # Ready at once; indexes build in the background instead of in the first turn
+                    self.executor.submit(self.pipeline.warm_up)
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self.executor.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        route = (scope["method"], scope["path"])
+        if route == ("GET", "/health"):
+            await send_json(send, 200, {"status": "ok", "sessions": len(self.store)})
+        elif route == ("GET", "/metrics") and get_tracer().sink(PrometheusSink) is not None:
+            await send_text(send, 200, get_tracer().sink(PrometheusSink).render(), b"text/plain; version=0.0.4")
+        elif route == ("POST", "/chat"):
+            await self.chat(receive, send)
+        else:
+            await send_json(send, 404, {"error": "not found"})
+
+    async def chat(self, receive, send):
+        try:
+            request = json.loads(await read_body(receive) or b"{}")
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or not isinstance(request.get("message"), str):
+            await send_json(send, 400, {"error": 'expected JSON body {"message": "..."}'})
+            return
+        message = request["message"].strip()
+        if not message:
+            await send_json(send, 400, {"error": "message is empty"})
+            return
+        try:
+            session_id = check_id(str(request.get("session_id") or uuid.uuid4().hex))
+        except ValueError as exc:
+            await send_json(send, 400, {"error": str(exc)})
+            return
+        loop = asyncio.get_running_loop()
+
+        async with self.lock(session_id):
+            if not request.get("stream", True):
+                result = await loop.run_in_executor(self.executor, self.run_turn, session_id, message, None)
+                await send_json(send, 200, {"session_id": session_id, **result})
+                return
+
+            deltas = asyncio.Queue()
+            shown = [0]
+
+            def on_delta(text):
+                # Called on the worker thread with the reply so far; forward only the new part
+                loop.call_soon_threadsafe(deltas.put_nowait, text[shown[0]:])
+                shown[0] = len(text)
+
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"),
+            ]})
+            turn = loop.run_in_executor(self.executor, self.run_turn, session_id, message, on_delta)
+            turn.add_done_callback(lambda _: deltas.put_nowait(None))
+            while (delta := await deltas.get()) is not None:
+                if delta:
+                    await send_event(send, "delta", {"text": delta})
+            try:
+                result = await turn
+            except Exception as exc:
+                # Headers are already out, so report the failure in-band
+                await send_event(send, "error", {"session_id": session_id, "error": repr(exc)}, more=False)
+                return
+            await send_event(send, "done", {"session_id": session_id, **result}, more=False)
+
+    def run_turn(self, session_id, message, on_delta):
+        # Opened fresh each turn: another worker process may have served the previous one
+        session = self.store.open(session_id)
+        before = len(session.messages)
+        response, session.messages = self.pipeline.process_user_message(
+            message, session.messages, on_delta=on_delta, context=session.context
+        )
+        self.store.save(session)
+        return {"response": response, "refused": len(session.messages) == before}
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status, payload):
+    await send_text(send, status, json.dumps(payload), b"application/json")
+
+
+async def send_text(send, status, text, content_type):
+    body = text.encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", content_type), (b"content-length", str(len(body)).encode()),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_event(send, event, payload, more=True):
+    data = f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+    await send({"type": "http.response.body", "body": data, "more_body": more})
+
+
+def create_app(fake=False, fake_latency=0.2):
+    """App factory for uvicorn; fake=True serves FakeOpenAI instead of the real API"""
+    configure_from_env()
+    if fake:
+        from fake_openai import FakeOpenAI
+        client = FakeOpenAI(first_token_delay=fake_latency, token_delay=0.002, moderation_delay=fake_latency / 4)
+    else:
+        from llm import create_client
+        client = create_client()
+        if client is None:
+            raise RuntimeError("Missing OPENAI_API_KEY in environment or .env file")
+    return ChatServer(ChatPipeline(client, cache=cache_from_env(), router=router_from_env()), store=session_store_from_env())
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Serve the chat pipeline over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--fake", action="store_true", help="answer with the offline FakeOpenAI client")
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    args = parser.parse_args()
+    uvicorn.run(create_app(fake=args.fake, fake_latency=args.fake_latency), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
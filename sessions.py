@@ -0,0 +1,318 @@
+"""Persistent chat sessions, resumable by id from any process.
+
+A session is its message history plus the ContextWindow state (rolling
+summary and how many messages it has folded). SessionStore.open() loads
+only the recent tail of the history; older messages load on first access
+through History, so long conversations cost the same to resume as short
+ones. SessionStore.save() appends just the messages added since the
+session was opened or last saved. The storage backend is pluggable:
+MemoryBackend (per process), SQLiteBackend (WAL, shared by every process
+on the host) or FileBackend (one append-only JSONL file per session).
+
+Two processes appending to the same session at once is a conflict: the
+second save raises SessionConflict instead of interleaving turns.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from context import ContextWindow
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileBackend is then only safe within one process
+    fcntl = None
+
+_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class SessionConflict(Exception):
+    """Another writer appended to the session since it was opened"""
+
+
+def check_id(session_id):
+    if not _ID_RE.fullmatch(session_id):
+        raise ValueError(f"invalid session id {session_id!r} (use 1-64 letters, digits, '-' or '_')")
+    return session_id
+
+
+class History(Sequence):
+    """A session's messages with only the tail from offset in memory; older ones load on first access.
+
+    Slicing the recent part (what ContextWindow and the transcript read)
+    never touches storage. ``history + new_messages`` returns another
+    History sharing the loaded tail, as the pipeline expects of a list.
+    """
+
+    def __init__(self, load_range, offset, tail):
+        self._load_range = load_range
+        self._offset = offset
+        self._tail = list(tail)
+
+    def __len__(self):
+        return self._offset + len(self._tail)
+
+    @property
+    def loaded(self):
+        """How many messages are in memory"""
+        return len(self._tail)
+
+    def _ensure(self, start):
+        if start < self._offset:
+            self._tail = self._load_range(start, self._offset) + self._tail
+            self._offset = start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            indices = range(*i.indices(len(self)))
+            if not indices:
+                return []
+            self._ensure(min(indices[0], indices[-1]))
+            return [self._tail[j - self._offset] for j in indices]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("history index out of range")
+        self._ensure(i)
+        return self._tail[i - self._offset]
+
+    def __add__(self, other):
+        return History(self._load_range, self._offset, self._tail + list(other))
+
+    def __repr__(self):
+        return f"History({len(self)} messages, {self.loaded} loaded)"
+
+
+class Session:
+    """One conversation: id, messages (a History), its ContextWindow and how much of it is stored"""
+
+    __slots__ = ("id", "messages", "context", "saved")
+
+    def __init__(self, session_id, messages, context, saved):
+        self.id = session_id
+        self.messages = messages
+        self.context = context
+        self.saved = saved
+
+
+class MemoryBackend:
+    """Sessions in this process only"""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id, recent):
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is None:
+                return None
+            start = max(0, min(data["folded"], len(data["messages"]) - recent))
+            return data["summary"], data["folded"], start, list(data["messages"][start:])
+
+    def load_range(self, session_id, start, stop):
+        with self._lock:
+            return list(self._sessions[session_id]["messages"][start:stop])
+
+    def append(self, session_id, start, messages, summary, folded):
+        with self._lock:
+            data = self._sessions.setdefault(session_id, {"messages": [], "summary": "", "folded": 0})
+            if len(data["messages"]) != start:
+                raise SessionConflict(session_id)
+            data["messages"].extend(dict(m) for m in messages)
+            data["summary"], data["folded"] = summary, folded
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteBackend:
+    """Sessions in a SQLite file (WAL), shared by every process that opens it"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, length INTEGER NOT NULL, "
+            "summary TEXT NOT NULL, folded INTEGER NOT NULL, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages (session_id TEXT NOT NULL, seq INTEGER NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+
+    def load(self, session_id, recent):
+        with self._lock:
+            row = self._db.execute("SELECT length, summary, folded FROM sessions WHERE id = ?",
+                                   (session_id,)).fetchone()
+            if row is None:
+                return None
+            length, summary, folded = row
+            start = max(0, min(folded, length - recent))
+            return summary, folded, start, self._range(session_id, start, length)
+
+    def _range(self, session_id, start, stop):
+        rows = self._db.execute("SELECT role, content FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? "
+                                "ORDER BY seq", (session_id, start, stop))
+        return [{'role': role, 'content': content} for role, content in rows]
+
+    def load_range(self, session_id, start, stop):
+        with self._lock:
+            return self._range(session_id, start, stop)
+
+    def append(self, session_id, start, messages, summary, folded):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT length FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                if (row[0] if row else 0) != start:
+                    raise SessionConflict(session_id)
+                self._db.executemany("INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                                     [(session_id, start + i, m['role'], m['content'])
+                                      for i, m in enumerate(messages)])
+                self._db.execute(
+                    "INSERT INTO sessions (id, length, summary, folded, created, updated) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET length = excluded.length, summary = excluded.summary, "
+                    "folded = excluded.folded, updated = excluded.updated",
+                    (session_id, start + len(messages), summary, folded, now, now),
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class FileBackend:
+    """One append-only JSONL file per session in a directory.
+
+    Each save appends the new messages and a state line (summary, folded) in
+    a single write under an exclusive lock. Since files only grow, the byte
+    offset of every message is indexed once and the index caught up from the
+    last known end of file, so opening a long session reads just its tail.
+    """
+
+    def __init__(self, directory, max_indexed=1024):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.max_indexed = max_indexed
+        self._indexes = OrderedDict()  # session id -> [end offset, message offsets, summary, folded]
+        self._lock = threading.Lock()
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def _index(self, session_id, f):
+        """Index of the open file f, updated with whatever was appended since it was last read"""
+        index = self._indexes.pop(session_id, None) or [0, array("q"), "", 0]
+        self._indexes[session_id] = index
+        while len(self._indexes) > self.max_indexed:
+            self._indexes.popitem(last=False)
+        f.seek(index[0])
+        offset = index[0]
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # another process is mid-write; pick it up next time
+            if line.startswith(b'{"state"'):
+                state = json.loads(line)["state"]
+                index[2], index[3] = state["summary"], state["folded"]
+            else:
+                index[1].append(offset)
+            offset += len(line)
+        index[0] = offset
+        return index
+
+    def _messages(self, f, offsets, start, stop):
+        if start >= stop:
+            return []
+        f.seek(offsets[start])
+        messages = []
+        while len(messages) < stop - start:
+            line = f.readline()
+            if not line.startswith(b'{"state"'):
+                messages.append(json.loads(line))
+        return messages
+
+    def load(self, session_id, recent):
+        try:
+            f = open(self._path(session_id), "rb")
+        except FileNotFoundError:
+            return None
+        with f, self._lock:
+            end, offsets, summary, folded = self._index(session_id, f)
+            start = max(0, min(folded, len(offsets) - recent))
+            return summary, folded, start, self._messages(f, offsets, start, len(offsets))
+
+    def load_range(self, session_id, start, stop):
+        with open(self._path(session_id), "rb") as f, self._lock:
+            return self._messages(f, self._index(session_id, f)[1], start, stop)
+
+    def append(self, session_id, start, messages, summary, folded):
+        lines = [json.dumps({'role': m['role'], 'content': m['content']}) for m in messages]
+        lines.append(json.dumps({"state": {"summary": summary, "folded": folded}}))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self._lock, open(self._path(session_id), "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if len(self._index(session_id, f)[1]) != start:
+                    raise SessionConflict(session_id)
+                f.write(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+
+class SessionStore:
+    """Opens and saves Sessions on a backend; recent is how many messages open() loads up front"""
+
+    def __init__(self, backend=None, recent=40, context_factory=ContextWindow):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.recent = recent
+        self.context_factory = context_factory
+
+    def open(self, session_id=None):
+        """The stored session session_id, or a new empty one (with a fresh id if none is given)"""
+        session_id = check_id(session_id) if session_id else uuid.uuid4().hex
+        context = self.context_factory()
+        data = self.backend.load(session_id, self.recent)
+        if data is None:
+            return Session(session_id, History(None, 0, []), context, 0)
+        context.summary, context.folded, start, tail = data
+        messages = History(lambda a, b: self.backend.load_range(session_id, a, b), start, tail)
+        return Session(session_id, messages, context, len(messages))
+
+    def save(self, session):
+        """Append the messages added since open/last save, with the context state"""
+        new = session.messages[session.saved:]
+        if not new:
+            return
+        self.backend.append(session.id, session.saved, new, session.context.summary, session.context.folded)
+        session.saved += len(new)
+
+    def __len__(self):
+        return len(self.backend)
+
+
+def session_store_from_env():
+    """In-memory store, or a persistent one at $SESSION_STORE_PATH (a .db file for SQLite, else a directory)"""
+    path = os.getenv("SESSION_STORE_PATH")
+    if not path:
+        return SessionStore()
+    return SessionStore(SQLiteBackend(path) if path.endswith((".db", ".sqlite", ".sqlite3")) else FileBackend(path))
@@ -0,0 +1,265 @@
+"""Per-stage timing of chat turns.
+
+Code marks a stage with
+
+    with span("pipeline.match") as s:
+        matched = ...
+        s.set(products=len(matched))
+
+and every configured sink gets the finished span: its name, wall time,
+attributes (token counts, cache hits, matched products...) and parent, so a
+turn reads as a tree. Sinks: LogSink (one log line per span),
+PrometheusSink (histograms/counters in the text exposition format),
+OTelSink (OpenTelemetry spans, if opentelemetry is installed) and
+MemorySink (recent spans, for the debug panel). With no sink configured,
+span() returns a shared no-op and tracing costs a function call.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage; use as a context manager (errors are recorded and re-raised)"""
+
+    __slots__ = ("name", "attributes", "parent", "trace_id", "span_id", "start_ns", "duration", "_t0", "_token",
+                 "_tracer")
+
+    def __init__(self, tracer, name, attributes):
+        parent = _current.get()
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.duration = None
+        self._tracer = tracer
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000 if self.duration is not None else None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current.set(self)
+        self._tracer._started(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self._tracer._finished(self)
+        return False
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.duration_ms:.2f}ms, {self.attributes})"
+
+
+class _NoopSpan:
+    """Stands in for Span while tracing is off"""
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Hands finished spans to its sinks; with none, span() is a no-op"""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def span(self, name, **attributes):
+        if not self.sinks:
+            return _NOOP
+        return Span(self, name, attributes)
+
+    def _started(self, span):
+        for sink in self.sinks:
+            on_start = getattr(sink, "on_start", None)
+            if on_start is None:
+                continue
+            try:
+                on_start(span)
+            except Exception:
+                logger.exception("Trace sink %r failed", sink)
+
+    def _finished(self, span):
+        for sink in self.sinks:
+            try:
+                sink.on_end(span)
+            except Exception:
+                # A broken exporter must not break the chat
+                logger.exception("Trace sink %r failed", sink)
+
+    def sink(self, kind):
+        """The first configured sink of class kind, or None"""
+        return next((s for s in self.sinks if isinstance(s, kind)), None)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def configure(*sinks):
+    """Send spans to sinks from now on; configure() with no sinks turns tracing off"""
+    _tracer.sinks = list(sinks)
+    return _tracer
+
+
+def span(name, **attributes):
+    """A span on the process tracer (the no-op when tracing is off)"""
+    if not _tracer.sinks:
+        return _NOOP
+    return Span(_tracer, name, attributes)
+
+
+class LogSink:
+    """One log line per finished span"""
+
+    def __init__(self, logger_name="chat.trace", level=logging.INFO):
+        self.logger = logging.getLogger(logger_name)
+        self.level = level
+
+    def on_end(self, span):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        attributes = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+        self.logger.log(self.level, "span=%s ms=%.2f trace=%s %s", span.name, span.duration_ms, span.trace_id[:8],
+                        attributes)
+
+
+class MemorySink:
+    """The last maxlen finished spans, for the debug panel"""
+
+    def __init__(self, maxlen=500):
+        self.spans = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def on_end(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def trace(self, trace_id):
+        """The kept spans of trace_id, in start order"""
+        with self._lock:
+            spans = [s for s in self.spans if s.trace_id == trace_id]
+        return sorted(spans, key=lambda s: s.start_ns)
+
+    def last_trace(self, name=None):
+        """Spans of the trace holding the latest root span (or latest span called name), in start order"""
+        with self._lock:
+            spans = list(self.spans)
+        for latest in reversed(spans):
+            if (latest.parent is None) if name is None else (latest.name == name):
+                return sorted((s for s in spans if s.trace_id == latest.trace_id), key=lambda s: s.start_ns)
+        return []
+
+
+class PrometheusSink:
+    """Per-stage latency histograms and attribute counters, rendered in Prometheus' text format.
+
+    Numeric and boolean attributes are summed per span name, so token
+    counts, cache hits and matched products become counters.
+    """
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix="chat"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._buckets = defaultdict(lambda: [0] * len(self.BUCKETS))
+        self._count = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._attributes = defaultdict(float)
+
+    def on_end(self, span):
+        with self._lock:
+            self._count[span.name] += 1
+            self._sum[span.name] += span.duration
+            buckets = self._buckets[span.name]
+            for i, bound in enumerate(self.BUCKETS):
+                if span.duration <= bound:
+                    buckets[i] += 1
+            for key, value in span.attributes.items():
+                if isinstance(value, (int, float)):
+                    self._attributes[span.name, key] += value
+
+    def render(self):
+        p = self.prefix
+        lines = [f"# HELP {p}_span_duration_seconds Wall time per stage of a chat turn",
+                 f"# TYPE {p}_span_duration_seconds histogram"]
+        with self._lock:
+            for name in sorted(self._count):
+                for bound, count in zip(self.BUCKETS, self._buckets[name]):
+                    lines.append(f'{p}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'{p}_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {self._count[name]}')
+                lines.append(f'{p}_span_duration_seconds_sum{{span="{name}"}} {self._sum[name]}')
+                lines.append(f'{p}_span_duration_seconds_count{{span="{name}"}} {self._count[name]}')
+            lines += [f"# HELP {p}_span_attribute_total Sum of a numeric span attribute (true counts as 1)",
+                      f"# TYPE {p}_span_attribute_total counter"]
+            for (name, key), value in sorted(self._attributes.items()):
+                lines.append(f'{p}_span_attribute_total{{span="{name}",attribute="{key}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+class OTelSink:
+    """Mirror spans into OpenTelemetry (needs the opentelemetry-api package and a configured SDK)"""
+
+    def __init__(self, tracer_name="chatbot"):
+        from opentelemetry import trace
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+        self._open = {}
+
+    def on_start(self, span):
+        parent = self._open.get(span.parent.span_id) if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        self._open[span.span_id] = self._tracer.start_span(span.name, context=context, start_time=span.start_ns)
+
+    def on_end(self, span):
+        otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value)
+        otel_span.end(end_time=span.start_ns + int(span.duration * 1e9))
+
+
+SINKS = {"log": LogSink, "memory": MemorySink, "prometheus": PrometheusSink, "otel": OTelSink}
+
+
+def configure_from_env():
+    """Configure the sinks named in $TRACE_SINKS (comma-separated: log, memory, prometheus, otel)"""
+    names = [n.strip() for n in os.getenv("TRACE_SINKS", "").split(",") if n.strip()]
+    for name in names:
+        if name not in SINKS:
+            logger.warning("Unknown trace sink %r in TRACE_SINKS (known: %s)", name, ", ".join(SINKS))
+    return configure(*(SINKS[name]() for name in names if name in SINKS))